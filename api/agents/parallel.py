@@ -21,6 +21,7 @@ from .universal import (
     get_universal_factory,
     AgentType,
     UniversalResult,
+    _make_error_result,
 )
 
 logger = logging.getLogger(__name__)
@@ -115,12 +116,8 @@ class OptimizedParallelManager:
             if isinstance(result, Exception):
                 logger.error(f"Agent {agent_type} failed: {result}")
                 # Create error result using UniversalResult
-                final_results[agent_type] = UniversalResult(
-                    agent_type=agent_type,
-                    content=f"Agent execution failed: {str(result)}",
-                    metadata={"error": str(result), "session_id": session_id},
-                    confidence=0.0,
-                    sources=[],
+                final_results[agent_type] = _make_error_result(
+                    agent_type, result, session_id=session_id
                 )
             else:
                 final_results[agent_type] = result
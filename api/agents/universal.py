@@ -10,29 +10,148 @@ This module represents the culmination of backend simplification, achieving:
 - Proper conversation history using Pydantic AI message_history patterns
 """
 
+import asyncio
+import hashlib
+import inspect
+import json
 import logging
 import os
-from typing import Dict, Any, Optional, AsyncGenerator, List
+import re
+import tempfile
+import threading
+import time
+from typing import (
+    Dict,
+    Any,
+    Hashable,
+    Optional,
+    AsyncGenerator,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+)
+from collections import OrderedDict, deque
+from contextlib import AsyncExitStack, aclosing, suppress
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
 from enum import Enum
 from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
 from pydantic_ai import Agent
-from pydantic_ai.messages import ModelMessage, ModelRequest, ModelResponse
+from pydantic_ai.messages import ModelMessage, ModelRequest
 from pydantic_ai.messages import (
     ToolCallPart,
     ToolReturnPart,
     SystemPromptPart,
+    UserPromptPart,
+    ModelMessagesTypeAdapter,
 )
 from pydantic_ai.mcp import MCPServerStreamableHTTP
+from pydantic_ai.toolsets import WrapperToolset
+
+from ..utils.mcp_registry import get_mcp_registry
+from .utils.convergence import ConvergenceDetector, ConvergenceConfig
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Handlers and levels are configured by the host application (api/index.py)
 logger = logging.getLogger(__name__)
 
 # ✅ ENHANCED: Read MCP_SERVER_URL from environment with graceful fallback
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL")  # Can be None if not set
 
+# Default wall-clock limit (seconds) for one agent run; ToolBudget.time_budget_s
+AGENT_EXECUTION_TIMEOUT = float(os.getenv("AGENT_EXECUTION_TIMEOUT", "120"))
+
+# Maximum number of recent responses kept by BudgetTracker
+_RESPONSE_WINDOW = 10
+# Number of latest confidence scores averaged by BudgetTracker.should_stop
+_CONFIDENCE_WINDOW = 3
+
+# Bounds on what ConversationContext retains from MCP tool results
+_MAX_CACHED_RESULTS = 64
+_MAX_ENTITY_SCAN_CHARS = 64_000
+_MAX_STORED_RESULT_CHARS = 1000
+
+# Search/QA results longer than this are also written in full to disk, with
+# only the path and a preview kept in context (0, the default, disables it)
+TOOL_RESULT_PERSIST_THRESHOLD = int(os.getenv("TOOL_RESULT_PERSIST_THRESHOLD", "0"))
+_TOOL_RESULT_DIR = Path(tempfile.gettempdir()) / "woolly_mcp"
+# Retention of persisted results; least recently written files go first
+_MAX_TOOL_RESULT_FILES = 256
+_MAX_TOOL_RESULT_BYTES = 256 * 1024 * 1024
+
+# System message summarising a repository's discovered entities
+_ENTITIES_PROMPT_TEMPLATE = """
+## Previously Discovered Entities for {repository_name}:
+
+Valid Entity IDs: {entity_ids}  # Show first 10
+Discovered Entities: {entity_count} entities cached
+Entity Relationships: {relationship_count} relationships cached
+
+Use these valid entity IDs for relationship queries instead of making new discovery calls.
+"""
+
+# End of a sentence or line in a streamed delta; BudgetTracker is fed whole
+# segments, since single tokens repeat often enough to look converged
+_SEGMENT_END_RE = re.compile(r"[.!?](?:\s|$)|\n")
+
+# Framing of build_text_stream's '0:{"type": "text", "text": ...}' V5 events
+_TEXT_EVENT_PREFIX = '0:{"type": "text", "text": '
+
+# Messages kept in a repository's conversation history; older turns are dropped
+_MAX_HISTORY_MESSAGES = 200
+
+# Upper bound on tool results parsed concurrently per agent turn
+_MAX_TOOL_RESULT_CONCURRENCY = 8
+# Tools whose parsers write ConversationContext.repository_info
+_REPOSITORY_INFO_TOOLS = frozenset({"repo_get_info", "search_code", "qa_codebase"})
+
+# Opt-in (context["cache_enabled"]) cache of completed agent runs
+_MAX_CACHED_RESPONSES = 512
+
+# Upper bound on concurrent MCP tool calls per server; MCP throughput
+# plateaus at a few dozen in-flight requests while latency keeps growing
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "32"))
+
+# MCP circuit breaker: more than _MCP_MAX_FAILURES failed MCP runs within
+# _MCP_FAILURE_WINDOW_S skips MCP tools for _MCP_COOLDOWN_S
+_MCP_MAX_FAILURES = 3
+_MCP_FAILURE_WINDOW_S = 30.0
+_MCP_COOLDOWN_S = 120.0
+
+# Troubleshooting hints returned with every failed MCP connection test
+_BASE_SUGGESTIONS = (
+    "Check if FastMCP server is running on port 8009",
+    "Verify FastMCP 2.10.0 is installed correctly",
+    "Check network connectivity to localhost:8009/sse/",
+    "Restart the MCP server if needed",
+)
+# Extra hint for the first of these keywords found in the error message
+_KEYWORD_SUGGESTIONS = {
+    "connection": "Server may not be running or accessible",
+    "version": "Version mismatch - ensure client and server compatibility",
+    "api": "Check OpenAI API configuration",
+}
+
+# Streams idle this long (e.g. while an MCP tool runs) get an empty text
+# delta, so proxies and clients don't time the connection out
+_STREAM_HEARTBEAT_INTERVAL_S = 15.0
+_HEARTBEAT_EVENT = _TEXT_EVENT_PREFIX + '""}\n'
+
+# Entity IDs are lowercase UUIDs; the shape (not just [a-f0-9-]{36}) keeps
+# runs of hex/dashes in tool output from being picked up as IDs
+_ENTITY_ID_RE = re.compile(
+    r"(?<![a-f0-9-])[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}(?![a-f0-9-])"
+)
+
+# Entity detail fields recorded from find_entities results
+_ENTITY_INFO_FIELDS = ("entity", "name", "type", "file", "path")
+
 
 class AgentType(str, Enum):
     """Universal agent types - single enum for all agent specializations"""
@@ -45,6 +164,307 @@ class AgentType(str, Enum):
     CHAT_ASSISTANT = "chat_assistant"  # New: MCP-enabled chat agent
 
 
+# Agent types that work through the repository's MCP tools; the rest are
+# prompt-to-text agents that run without opening an MCP session
+_NEEDS_MCP = frozenset(
+    {
+        AgentType.SIMPLIFIER,
+        AgentType.TESTER,
+        AgentType.DOCUMENTATION,
+        AgentType.CHAT_ASSISTANT,
+    }
+)
+
+# Agent specializations - prompt-based differentiation.
+# Static, normalized constants: every request sends a byte-identical system
+# prompt, keeping it eligible for provider-side prompt caching. Per-request
+# context (discovered entities, etc.) is appended after the history instead.
+_SPECIALIZATIONS: Dict[AgentType, str] = {
+    AgentType.SIMPLIFIER: inspect.cleandoc(
+        """
+    You are a code simplification expert. Your role is to analyze code and provide
+    actionable suggestions for simplification, refactoring, and optimization.
+
+    Focus on:
+    - DRY (Don't Repeat Yourself) principles
+    - Code readability improvements
+    - Performance optimizations
+    - Best practices implementation
+
+    Always provide specific, actionable recommendations with code examples.
+    """
+    ),
+    AgentType.TESTER: inspect.cleandoc(
+        """
+    You are a comprehensive testing expert. Your role is to analyze code and create
+    thorough test suites that ensure code quality and reliability.
+
+    Focus on:
+    - Unit test creation
+    - Integration test strategies
+    - Edge case identification
+    - Test coverage analysis
+
+    Always provide complete, runnable test code with clear explanations.
+    """
+    ),
+    AgentType.CONVO_STARTER: inspect.cleandoc(
+        """
+    You are a conversation starter expert. Your role is to analyze content and
+    generate engaging, thought-provoking conversation starters.
+
+    Focus on:
+    - Interesting discussion points
+    - Relevant questions
+    - Engaging prompts
+    - Context-aware suggestions
+
+    Always provide multiple conversation starter options.
+    """
+    ),
+    AgentType.SUMMARIZER: inspect.cleandoc(
+        """
+    You are a content summarization expert. Your role is to analyze content and
+    create concise, informative summaries.
+
+    Focus on:
+    - Key point extraction
+    - Structured summaries
+    - Context preservation
+    - Actionable insights
+
+    Always provide clear, well-organized summaries.
+    """
+    ),
+    AgentType.DOCUMENTATION: inspect.cleandoc(
+        """
+    You are a documentation expert. Your role is to analyze code and create
+    comprehensive, helpful documentation.
+
+    Focus on:
+    - API documentation
+    - Code explanations
+    - Usage examples
+    - Best practices
+
+    Always provide clear, thorough documentation.
+    """
+    ),
+    AgentType.CHAT_ASSISTANT: inspect.cleandoc(
+        """
+    You are a helpful AI assistant with full access to the codebase via MCP tools.
+
+    You excel at natural conversation while providing code-aware responses. You can:
+    - Answer questions using repository knowledge
+    - Search and analyze code patterns
+    - Explain implementations and architectures
+    - Help with development tasks
+    - Provide contextual code examples
+
+    Available MCP Tools:
+    - search_code: Find code patterns, functions, and implementations
+    - find_entities: Discover classes, functions, files, and modules
+    - get_entity_relationships: Map dependencies and relationships
+    - qa_codebase: Get comprehensive insights about the codebase
+    - generate_diagram: Create visual representations of code structure
+
+    Use these tools naturally when users ask about code, want to explore the
+    repository, or need technical context. Always maintain a conversational
+    tone while providing accurate, helpful information.
+
+    When using MCP tools, explain what you're doing and why it's helpful.
+    """
+    ),
+}
+# Read-only, so no caller can change a prompt out from under the agent cache
+_SPECIALIZATIONS = MappingProxyType(_SPECIALIZATIONS)
+
+
+def _update_digest(digest: "hashlib._Hash", *chunks: bytes) -> None:
+    """Feed chunks into digest, length-prefixed so boundaries can't collide"""
+    for chunk in chunks:
+        digest.update(len(chunk).to_bytes(8, "big"))
+        digest.update(chunk)
+
+
+def _prompt_digest(agent_type: AgentType) -> "hashlib._Hash":
+    digest = hashlib.sha256()
+    _update_digest(
+        digest, agent_type.value.encode(), _SPECIALIZATIONS[agent_type].encode()
+    )
+    return digest
+
+
+# sha256 state after each agent type and its prompt; response-cache keys copy
+# it rather than hashing the prompt again
+_PROMPT_DIGESTS = MappingProxyType(
+    {agent_type: _prompt_digest(agent_type) for agent_type in _SPECIALIZATIONS}
+)
+
+
+def _put_bounded(
+    cache: "OrderedDict[str, Any]",
+    key: str,
+    value: Any,
+    maxsize: int = _MAX_CACHED_RESULTS,
+) -> None:
+    """Insert into an LRU-ordered dict, evicting the oldest entries past maxsize"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+def _tool_content_text(content: Any) -> str:
+    """Text form of a tool result; strings pass through untouched"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, (bytes, bytearray)):
+        return content.decode("utf-8", "replace")
+    if isinstance(content, (dict, list, tuple)):
+        # Structured MCP results: JSON keeps IDs in the `"id": "..."` form the
+        # find_entities patterns and structured parsing understand
+        return json.dumps(content, ensure_ascii=False, default=str)
+    return str(content)
+
+
+def _preview(content: Any, limit: int) -> str:
+    """First `limit` characters of a tool result, rendering only what is kept"""
+    if not isinstance(content, str):
+        # Every item renders to at least one character, so `limit` items
+        # are always enough to fill the preview
+        if isinstance(content, dict):
+            content = dict(islice(content.items(), limit))
+        elif isinstance(content, (list, tuple)):
+            content = list(islice(content, limit))
+        content = json.dumps(content, ensure_ascii=False, default=str)
+    return content if len(content) <= limit else content[:limit]
+
+
+def _evict_tool_results(keep: Path) -> None:
+    """Delete the oldest persisted results until the directory is within its caps"""
+    files = []
+    for candidate in _TOOL_RESULT_DIR.glob("*.txt"):
+        try:
+            stat = candidate.stat()
+        except OSError:
+            continue  # Removed by a concurrent eviction
+        files.append((stat.st_mtime, stat.st_size, candidate))
+    files.sort(key=lambda f: f[0])
+
+    count = len(files)
+    total = sum(size for _, size, _ in files)
+    for _, size, candidate in files:
+        if count <= _MAX_TOOL_RESULT_FILES and total <= _MAX_TOOL_RESULT_BYTES:
+            break
+        if candidate == keep:
+            continue
+        try:
+            candidate.unlink()
+        except OSError:
+            pass
+        count -= 1
+        total -= size
+
+
+async def _stored_tool_result(result_content: str, now_iso: str) -> Dict[str, Any]:
+    """Context entry for a search/QA result, persisting oversized results"""
+    entry = {
+        "result": _preview(result_content, _MAX_STORED_RESULT_CHARS),
+        "timestamp": now_iso,
+    }
+    if not 0 < TOOL_RESULT_PERSIST_THRESHOLD < len(result_content):
+        return entry
+
+    # Content-addressed, so repeated results share one file
+    digest = hashlib.sha256(result_content.encode("utf-8")).hexdigest()
+    path = _TOOL_RESULT_DIR / f"{digest}.txt"
+
+    def write() -> None:
+        if path.exists():
+            path.touch()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(result_content, encoding="utf-8")
+        _evict_tool_results(keep=path)
+
+    try:
+        await asyncio.to_thread(write)
+        entry["result_path"] = str(path)
+    except OSError as e:
+        logger.warning("Failed to persist tool result: %s", e)
+    return entry
+
+
+def _structured_entities(result_content: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Collect entities from a JSON MCP payload, keyed by entity ID.
+
+    Returns None when the payload is not JSON so callers can fall back to
+    regex scraping of the text response.
+    """
+    if not result_content or result_content.lstrip()[:1] not in ("{", "["):
+        return None
+    try:
+        payload = json.loads(result_content)
+    except ValueError:
+        return None
+
+    entities: Dict[str, Dict[str, Any]] = {}
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            entity_id = node.get("entity_id") or node.get("id")
+            if isinstance(entity_id, str) and len(entity_id) == 36:
+                entities.setdefault(entity_id, node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return entities
+
+
+async def _with_heartbeat(
+    stream: AsyncGenerator[str, None], interval: float, heartbeat: str
+) -> AsyncGenerator[str, None]:
+    """Re-yield stream's chunks, emitting heartbeat whenever it is idle for interval"""
+    queue: "asyncio.Queue[Tuple[Optional[str], Optional[Exception]]]" = asyncio.Queue(
+        maxsize=1
+    )
+
+    # The stream runs start to finish in one task, so the cancel scopes its MCP
+    # session opens are entered and exited from the same task
+    async def pump() -> None:
+        try:
+            async for chunk in stream:
+                await queue.put((chunk, None))
+            await queue.put((None, None))
+        except Exception as e:
+            await queue.put((None, e))
+        finally:
+            await stream.aclose()
+
+    producer = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                chunk, error = await asyncio.wait_for(queue.get(), interval)
+            except asyncio.TimeoutError:
+                yield heartbeat
+                continue
+            if error is not None:
+                raise error
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # Wait for pump to unwind the stream so its MCP session is closed
+        # before this generator exits
+        producer.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
+
+
 class ToolBudget(BaseModel):
     """
     Tool budget configuration for intelligent stopping criteria.
@@ -61,7 +481,10 @@ class ToolBudget(BaseModel):
         default=3, ge=1, le=10, description="Maximum recursion depth for tool chains"
     )
     time_budget_s: float = Field(
-        default=120.0, ge=1.0, le=600.0, description="Maximum execution time in seconds"
+        default=AGENT_EXECUTION_TIMEOUT,
+        ge=1.0,
+        le=600.0,
+        description="Maximum execution time in seconds",
     )
 
     # Convergence detection
@@ -102,6 +525,9 @@ class ToolBudget(BaseModel):
         default=4, ge=1, le=15, description="Maximum find_entities calls"
     )
 
+    # Configuration object - immutable once created
+    model_config = {"frozen": True}
+
     def model_post_init(self, __context):
         """Pydantic v2 post-init validation"""
         if self.max_tool_calls < self.max_depth:
@@ -130,13 +556,44 @@ class BudgetTracker(BaseModel):
     qa_calls_made: int = Field(default=0)
     entity_calls_made: int = Field(default=0)
 
-    # Convergence tracking
-    recent_responses: List[str] = Field(default_factory=list)
+    # Convergence and quality tracking - bounded windows kept out of the
+    # validated fields so appends evict in O(1) without re-slicing
+    _recent_responses: Deque[str] = PrivateAttr(
+        default_factory=lambda: deque(maxlen=_RESPONSE_WINDOW)
+    )
+    _confidence_scores: Deque[float] = PrivateAttr(
+        default_factory=lambda: deque(maxlen=_RESPONSE_WINDOW)
+    )
+    # Running sum over the last _CONFIDENCE_WINDOW scores for should_stop
+    _recent_conf_sum: float = PrivateAttr(default=0.0)
+    _recent_conf_count: int = PrivateAttr(default=0)
 
-    # Quality tracking
-    confidence_scores: List[float] = Field(default_factory=list)
+    # Monotonic clock anchor for elapsed time and deadline checks
+    _start_monotonic: float = PrivateAttr(default_factory=time.monotonic)
 
-    model_config = {"arbitrary_types_allowed": True}
+    # Counters are bumped per tool call; skip re-validation on assignment
+    model_config = {"arbitrary_types_allowed": True, "validate_assignment": False}
+
+    @property
+    def recent_responses(self) -> Deque[str]:
+        """Most recent responses for convergence tracking (oldest evicted first)"""
+        return self._recent_responses
+
+    @recent_responses.setter
+    def recent_responses(self, responses: Iterable[str]) -> None:
+        self._recent_responses = deque(responses, maxlen=_RESPONSE_WINDOW)
+
+    @property
+    def confidence_scores(self) -> Deque[float]:
+        """Confidence scores matching recent_responses"""
+        return self._confidence_scores
+
+    @confidence_scores.setter
+    def confidence_scores(self, scores: Iterable[float]) -> None:
+        self._confidence_scores = deque(scores, maxlen=_RESPONSE_WINDOW)
+        recent = list(self._confidence_scores)[-_CONFIDENCE_WINDOW:]
+        self._recent_conf_sum = sum(recent)
+        self._recent_conf_count = len(recent)
 
     def increment_tool_call(self, tool_name: str) -> None:
         """Increment counters for a tool call"""
@@ -152,17 +609,20 @@ class BudgetTracker(BaseModel):
 
     def add_response(self, response: str, confidence: float = 0.8) -> None:
         """Add a response for convergence tracking"""
-        self.recent_responses.append(response)
-        self.confidence_scores.append(confidence)
+        # Slide the running confidence sum before the deque evicts anything
+        if self._recent_conf_count == _CONFIDENCE_WINDOW:
+            self._recent_conf_sum -= self._confidence_scores[-_CONFIDENCE_WINDOW]
+        else:
+            self._recent_conf_count += 1
+        self._recent_conf_sum += confidence
 
-        # Keep only recent responses for convergence window
-        if len(self.recent_responses) > 10:  # Max window size
-            self.recent_responses = self.recent_responses[-10:]
-            self.confidence_scores = self.confidence_scores[-10:]
+        # Bounded deques drop the oldest entries once the window is full
+        self._recent_responses.append(response)
+        self._confidence_scores.append(confidence)
 
     def get_elapsed_time(self) -> float:
         """Get elapsed time in seconds"""
-        return (datetime.now() - self.start_time).total_seconds()
+        return time.monotonic() - self._start_monotonic
 
     def should_stop(self, budget: ToolBudget) -> tuple[bool, str]:
         """
@@ -179,7 +639,7 @@ class BudgetTracker(BaseModel):
         if self.current_depth >= budget.max_depth:
             return True, f"Exceeded max depth ({budget.max_depth})"
 
-        if self.get_elapsed_time() >= budget.time_budget_s:
+        if time.monotonic() >= self._start_monotonic + budget.time_budget_s:
             return True, f"Exceeded time budget ({budget.time_budget_s}s)"
 
         # Check token limits
@@ -205,13 +665,15 @@ class BudgetTracker(BaseModel):
         if self.entity_calls_made >= budget.max_entity_calls:
             return True, f"Exceeded entity calls limit ({budget.max_entity_calls})"
 
-        # Check convergence
-        if self._check_convergence(budget):
+        # Check convergence (skipped until a full window of responses exists)
+        if len(
+            self._recent_responses
+        ) >= budget.convergence_window and self._check_convergence(budget):
             return True, "Responses have converged"
 
         # Check quality threshold
-        if self.confidence_scores and len(self.confidence_scores) >= 3:
-            recent_avg_confidence = sum(self.confidence_scores[-3:]) / 3
+        if self._recent_conf_count >= _CONFIDENCE_WINDOW:
+            recent_avg_confidence = self._recent_conf_sum / self._recent_conf_count
             if recent_avg_confidence < budget.min_confidence:
                 return True, f"Confidence below threshold ({budget.min_confidence})"
 
@@ -219,11 +681,12 @@ class BudgetTracker(BaseModel):
 
     def _check_convergence(self, budget: ToolBudget) -> bool:
         """Check if recent responses have converged"""
-        if len(self.recent_responses) < budget.convergence_window:
+        window = budget.convergence_window
+        if len(self._recent_responses) < window:
             return False
 
         # Simple convergence check: compare recent responses for similarity
-        recent = self.recent_responses[-budget.convergence_window :]
+        recent = list(self._recent_responses)[-window:]
 
         # Count similar responses (basic string similarity)
         similar_count = 0
@@ -262,12 +725,21 @@ class BudgetTracker(BaseModel):
         return len(intersection) / len(union) if union else 0.0
 
 
+@dataclass(slots=True)
+class EntityRow:
+    """Everything the conversation context knows about a single entity"""
+
+    info: Dict[str, Any] = field(default_factory=dict)
+    relationships: List[Dict[str, Any]] = field(default_factory=list)
+    first_seen: str = ""
+
+
 class ConversationContext(BaseModel):
     """Conversation context to maintain entity knowledge and history using proper Pydantic AI message patterns"""
 
-    discovered_entities: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
-    valid_entity_ids: List[str] = Field(default_factory=list)
-    entity_relationships: Dict[str, List[Dict[str, Any]]] = Field(default_factory=dict)
+    # Entity ID -> row, in discovery order. Rows without info only carry
+    # relationships and are not (yet) valid entity IDs.
+    entities: Dict[str, EntityRow] = Field(default_factory=dict)
     repository_info: Dict[str, Any] = Field(default_factory=dict)
 
     # ✅ CORRECT: Use proper Pydantic AI message_history with ModelMessage objects
@@ -277,19 +749,72 @@ class ConversationContext(BaseModel):
 
     model_config = {"arbitrary_types_allowed": True}
 
+    @computed_field
+    @property
+    def discovered_entities(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            entity_id: row.info for entity_id, row in self.entities.items() if row.info
+        }
+
+    @computed_field
+    @property
+    def valid_entity_ids(self) -> List[str]:
+        return list(self.iter_valid_entity_ids())
+
+    @computed_field
+    @property
+    def entity_relationships(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            entity_id: row.relationships
+            for entity_id, row in self.entities.items()
+            if row.relationships
+        }
+
+    def iter_valid_entity_ids(self) -> Iterator[str]:
+        """Valid entity IDs in discovery order, without building a list"""
+        return (entity_id for entity_id, row in self.entities.items() if row.info)
+
+    def append_messages(self, messages: Iterable[ModelMessage]) -> None:
+        """Extend the history, dropping the oldest turns past _MAX_HISTORY_MESSAGES"""
+        history = self.message_history
+        history.extend(messages)
+
+        excess = len(history) - _MAX_HISTORY_MESSAGES
+        if excess <= 0:
+            return
+
+        # Only cut where a user turn starts, so no tool return loses its call
+        for cut in range(excess, len(history)):
+            message = history[cut]
+            if isinstance(message, ModelRequest) and any(
+                isinstance(part, UserPromptPart) for part in message.parts
+            ):
+                del history[:cut]
+                return
+
+    def entity_row(self, entity_id: str, now_iso: str) -> EntityRow:
+        """Get the row for an entity, creating it on first sight"""
+        row = self.entities.get(entity_id)
+        if row is None:
+            row = self.entities[entity_id] = EntityRow(first_seen=now_iso)
+        return row
+
 
-class UniversalDependencies(BaseModel):
+# A plain dataclass: deps are built per run and only read by our own code and
+# tools, so pydantic validation would be pure overhead
+@dataclass(slots=True)
+class UniversalDependencies:
     """Single dependency model for ALL agent types - Ultimate DRY"""
 
     repository_name: str
     agent_type: AgentType
     user_query: str
-    context: Dict[str, Any] = Field(default_factory=dict)
-    conversation_context: Optional[ConversationContext] = Field(default=None)
+    context: dict[str, Any] = field(default_factory=dict)
+    conversation_context: Optional[ConversationContext] = None
 
     # Tool budget for intelligent stopping
-    tool_budget: ToolBudget = Field(default_factory=ToolBudget)
-    budget_tracker: BudgetTracker = Field(default_factory=BudgetTracker)
+    tool_budget: ToolBudget = field(default_factory=ToolBudget)
+    budget_tracker: BudgetTracker = field(default_factory=BudgetTracker)
 
     # Optional fields for different agent types
     target_files: Optional[list[str]] = None
@@ -297,15 +822,13 @@ class UniversalDependencies(BaseModel):
     test_types: Optional[list[str]] = None
     documentation_type: Optional[str] = None  # For backward compatibility
 
-    model_config = {"arbitrary_types_allowed": True}
-
 
 class UniversalResult(BaseModel):
     """Single result model for ALL agent types - Ultimate DRY"""
 
     agent_type: AgentType
     content: str
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: dict[str, Any] = Field(default_factory=dict)
     confidence: float = Field(ge=0.0, le=1.0, default=0.8)
     sources: list[str] = Field(default_factory=list)
     conversation_context: Optional[ConversationContext] = Field(default=None)
@@ -316,7 +839,111 @@ class UniversalResult(BaseModel):
     next_actions: Optional[list[str]] = None
     condensed_summary: Optional[str] = None
 
-    model_config = {"arbitrary_types_allowed": True}
+    # Results are write-once; updates go through model_copy
+    model_config = {"frozen": True, "arbitrary_types_allowed": True}
+
+
+def _make_error_result(
+    agent_type: AgentType, error: BaseException, **metadata: Any
+) -> UniversalResult:
+    """Zero-confidence result standing in for a failed agent run"""
+    # Fields are built here, not taken from model output: skip validation
+    return UniversalResult.model_construct(
+        agent_type=agent_type,
+        content=f"Agent execution failed: {error}",
+        metadata={"error": str(error), **metadata},
+        confidence=0.0,
+        sources=[],
+    )
+
+
+@lru_cache(maxsize=32)
+def _convergence_config(
+    similarity_threshold: float, min_responses: int
+) -> ConvergenceConfig:
+    """Shared (frozen) convergence config for one tool budget's settings"""
+    return ConvergenceConfig(
+        similarity_threshold=similarity_threshold,
+        convergence_ratio=0.7,  # 70% of responses should be similar
+        min_responses=min_responses,
+        use_critic_model=True,  # Enable AI critic for semantic similarity
+    )
+
+
+def _tool_args_key(
+    name: str, tool_args: Dict[str, Any]
+) -> Optional[Tuple[str, Hashable]]:
+    """Hashable identity of a tool call, or None if its args can't be keyed"""
+    # MCP args are usually flat scalars, which key as sorted items without
+    # serializing; nested args fall back to canonical JSON
+    items = tuple(sorted(tool_args.items()))
+    try:
+        hash(items)
+        return name, items
+    except TypeError:
+        pass
+    try:
+        return name, json.dumps(tool_args, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _ToolCallState:
+    """In-flight calls and concurrency limit shared by every copy of a toolset"""
+
+    def __init__(self, max_concurrency: int) -> None:
+        self.inflight: Dict[Tuple[str, Hashable], "asyncio.Task[Any]"] = {}
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+
+@dataclass
+class CoalescingToolset(WrapperToolset[UniversalDependencies]):
+    """
+    MCP toolset whose identical concurrent tool calls share one RPC.
+
+    Calls are keyed by (tool name, canonical JSON args); while a call is in
+    flight, later callers await the same task instead of issuing their own.
+    At most max_concurrency RPCs run against the server at once.
+
+    pydantic-ai copies toolsets with dataclasses.replace on every run, so the
+    in-flight map and semaphore live in `state`, which the copies share.
+    """
+
+    max_concurrency: int = MCP_MAX_CONCURRENCY
+    state: Optional[_ToolCallState] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.state is None:
+            self.state = _ToolCallState(self.max_concurrency)
+
+    async def call_tool(self, name, tool_args, ctx, tool) -> Any:
+        key = _tool_args_key(name, tool_args)
+        if key is None:
+            return await self._call_limited(name, tool_args, ctx, tool)
+
+        inflight = self.state.inflight
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call_limited(name, tool_args, ctx, tool))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        # Shielded so one caller being cancelled doesn't fail the others
+        return await asyncio.shield(task)
+
+    async def _call_limited(self, name, tool_args, ctx, tool) -> Any:
+        semaphore = self.state.semaphore
+        if not semaphore.locked():
+            async with semaphore:
+                return await self.wrapped.call_tool(name, tool_args, ctx, tool)
+
+        started = time.monotonic()
+        async with semaphore:
+            logger.debug(
+                "Waited %.3fs for an MCP call slot (%s)",
+                time.monotonic() - started,
+                name,
+            )
+            return await self.wrapped.call_tool(name, tool_args, ctx, tool)
 
 
 class UniversalAgentFactory:
@@ -327,11 +954,31 @@ class UniversalAgentFactory:
         # Following Pydantic AI MCP documentation best practices
         # Server: FastMCP 2.9, Client: Pydantic AI native integration
 
+        # Built agents per (agent type, streaming); reset when the MCP server
+        # changes, since each agent is bound to the server's toolset
+        self._mcp_server: Optional[MCPServerStreamableHTTP] = None
+        self._mcp_toolsets: Tuple[CoalescingToolset, ...] = ()
+        self._agent_cache: Dict[Tuple[AgentType, bool], Agent] = {}
+        self._agent_cache_lock = threading.Lock()
+        # Agents without MCP tools, used when MCP fails; they don't depend on the
+        # server, so they survive server changes
+        self._fallback_agents: Dict[Tuple[AgentType, bool], Agent] = {}
+
+        # Last MCP ping result as (expires_at monotonic, available); reset
+        # with the agent cache when the server changes
+        self._mcp_probe_cache: Tuple[float, bool] = (0.0, False)
+        self._mcp_probe_ttl = 30.0
+
+        # Circuit breaker state for failing MCP runs (monotonic timestamps)
+        self._mcp_fail_count = 0
+        self._mcp_fail_window_start = 0.0
+        self._mcp_cooldown_until = 0.0
+
         # ✅ ENHANCED: Initialize MCP server only if URL is provided
         if MCP_SERVER_URL:
-            self.mcp_server = MCPServerStreamableHTTP(MCP_SERVER_URL)
+            self.mcp_server = MCPServerStreamableHTTP(url=MCP_SERVER_URL)
             self.mcp_available = True
-            logger.info(f"✅ MCP server initialized: {MCP_SERVER_URL}")
+            logger.info("✅ MCP server initialized: %s", MCP_SERVER_URL)
         else:
             self.mcp_server = None
             self.mcp_available = False
@@ -342,96 +989,123 @@ class UniversalAgentFactory:
         # ✅ CORRECT: Store conversation contexts per repository
         self.conversation_contexts: Dict[str, ConversationContext] = {}
 
-        # Agent specializations - prompt-based differentiation
-        self.specializations = {
-            AgentType.SIMPLIFIER: """
-            You are a code simplification expert. Your role is to analyze code and provide 
-            actionable suggestions for simplification, refactoring, and optimization.
-            
-            Focus on:
-            - DRY (Don't Repeat Yourself) principles
-            - Code readability improvements
-            - Performance optimizations
-            - Best practices implementation
-            
-            Always provide specific, actionable recommendations with code examples.
-            """,
-            AgentType.TESTER: """
-            You are a comprehensive testing expert. Your role is to analyze code and create 
-            thorough test suites that ensure code quality and reliability.
-            
-            Focus on:
-            - Unit test creation
-            - Integration test strategies
-            - Edge case identification
-            - Test coverage analysis
-            
-            Always provide complete, runnable test code with clear explanations.
-            """,
-            AgentType.CONVO_STARTER: """
-            You are a conversation starter expert. Your role is to analyze content and 
-            generate engaging, thought-provoking conversation starters.
-            
-            Focus on:
-            - Interesting discussion points
-            - Relevant questions
-            - Engaging prompts
-            - Context-aware suggestions
-            
-            Always provide multiple conversation starter options.
-            """,
-            AgentType.SUMMARIZER: """
-            You are a content summarization expert. Your role is to analyze content and 
-            create concise, informative summaries.
-            
-            Focus on:
-            - Key point extraction
-            - Structured summaries
-            - Context preservation
-            - Actionable insights
-            
-            Always provide clear, well-organized summaries.
-            """,
-            AgentType.DOCUMENTATION: """
-            You are a documentation expert. Your role is to analyze code and create 
-            comprehensive, helpful documentation.
-            
-            Focus on:
-            - API documentation
-            - Code explanations
-            - Usage examples
-            - Best practices
-            
-            Always provide clear, thorough documentation.
-            """,
-            AgentType.CHAT_ASSISTANT: """
-            You are a helpful AI assistant with full access to the codebase via MCP tools.
-            
-            You excel at natural conversation while providing code-aware responses. You can:
-            - Answer questions using repository knowledge
-            - Search and analyze code patterns
-            - Explain implementations and architectures  
-            - Help with development tasks
-            - Provide contextual code examples
-            
-            Available MCP Tools:
-            - search_code: Find code patterns, functions, and implementations
-            - find_entities: Discover classes, functions, files, and modules
-            - get_entity_relationships: Map dependencies and relationships
-            - qa_codebase: Get comprehensive insights about the codebase
-            - generate_diagram: Create visual representations of code structure
-            
-            Use these tools naturally when users ask about code, want to explore the 
-            repository, or need technical context. Always maintain a conversational 
-            tone while providing accurate, helpful information.
-            
-            When using MCP tools, explain what you're doing and why it's helpful.
-            """,
+        # Agent specializations - prompt-based differentiation. Kept as a public
+        # alias; internal lookups read the module constant directly
+        self.specializations = _SPECIALIZATIONS
+
+        # MCP connectivity is probed off the request path by the MCP status
+        # monitor (api.utils.mcp_status), which calls test_mcp_connection
+
+        # MCP tool name -> result parser, used by _process_tool_result
+        self._tool_result_parsers = {
+            "find_entities": self._parse_find_entities_result,
+            "search_code": self._parse_search_code_result,
+            "get_entity_relationships": self._parse_entity_relationships_result,
+            "repo_get_info": self._parse_repo_info_result,
+            "qa_codebase": self._parse_qa_codebase_result,
         }
 
-        # Don't test MCP connection on initialization - do it lazily
-        # This prevents async issues during module import
-        self._mcp_connection_tested = False
+        # Response cache: sha256(agent, prompt, history, query) -> result
+        self._response_cache: "OrderedDict[str, UniversalResult]" = OrderedDict()
+
+        # Constant end-of-stream frame for fallback paths, built on first use
+        self._cached_fallback_done_event: Optional[str] = None
+
+        # Rendered entities system message per repository, keyed by the
+        # (valid entities, entities with relationships) counts it reflects
+        self._entities_prompt_cache: Dict[str, Tuple[Tuple[int, int], ModelRequest]] = (
+            {}
+        )
+
+    def _build_entities_system_message(
+        self, context: ConversationContext, repository_name: str
+    ) -> Optional[ModelRequest]:
+        """System message summarising discovered entities, or None if there are none"""
+        valid_count = related_count = 0
+        for row in context.entities.values():
+            if row.info:
+                valid_count += 1
+            if row.relationships:
+                related_count += 1
+
+        if not valid_count:
+            return None
+
+        # Entities are append-only, so unchanged counts mean an unchanged prompt
+        key = (valid_count, related_count)
+        cached = self._entities_prompt_cache.get(repository_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        entities_context = _ENTITIES_PROMPT_TEMPLATE.format(
+            repository_name=repository_name,
+            entity_ids=list(islice(context.iter_valid_entity_ids(), 10)),
+            entity_count=valid_count,
+            relationship_count=related_count,
+        )
+        # ✅ CORRECT: Create proper ModelRequest with system prompt
+        system_message = ModelRequest(
+            parts=[SystemPromptPart(content=entities_context)]
+        )
+        self._entities_prompt_cache[repository_name] = (key, system_message)
+        return system_message
+
+    def _prepare_message_history(
+        self, context: ConversationContext, repository_name: str
+    ) -> List[ModelMessage]:
+        """Message history for a run, plus the discovered-entities system message"""
+        # agent.run copies message_history, so the stored list is passed as-is
+        history = context.message_history
+
+        # Appended after the history so the static system prompt stays the
+        # cacheable prefix
+        system_message = self._build_entities_system_message(context, repository_name)
+        if system_message is None:
+            return history
+        return [*history, system_message]
+
+    def _response_cache_key(
+        self,
+        agent_type: AgentType,
+        repository_name: str,
+        message_history: List[ModelMessage],
+        user_query: str,
+    ) -> str:
+        """
+        Hash everything that determines the model's answer for a run.
+
+        The key covers the full message history, and every miss appends its
+        run to that history, so repeating a query in the same conversation
+        misses; hits come from replaying a conversation, e.g. after its
+        context was cleared.
+        """
+        # Resume from the per-type prefix instead of rehashing the prompt
+        digest = _PROMPT_DIGESTS[agent_type].copy()
+        _update_digest(
+            digest,
+            repository_name.encode(),
+            ModelMessagesTypeAdapter.dump_json(message_history),
+            user_query.encode(),
+        )
+        return digest.hexdigest()
+
+    @property
+    def mcp_server(self) -> Optional[MCPServerStreamableHTTP]:
+        return self._mcp_server
+
+    @mcp_server.setter
+    def mcp_server(self, server: Optional[MCPServerStreamableHTTP]) -> None:
+        if server is self._mcp_server:
+            return
+        self._mcp_server = server
+        # Agents get this identity-stable tuple, one toolset shared by every
+        # agent so concurrent runs coalesce their calls; empty means no MCP
+        self._mcp_toolsets = (CoalescingToolset(server),) if server is not None else ()
+        with self._agent_cache_lock:
+            self._agent_cache = {}
+        self._mcp_probe_cache = (0.0, False)
+        self._mcp_fail_count = 0
+        self._mcp_cooldown_until = 0.0
 
     def refresh_mcp(self) -> None:
         """
@@ -441,8 +1115,6 @@ class UniversalAgentFactory:
         and updates the factory's MCP server instance accordingly.
         """
         try:
-            from ..utils.mcp_registry import get_mcp_registry
-
             registry = get_mcp_registry()
             registry_server = registry.active_server
 
@@ -451,13 +1123,13 @@ class UniversalAgentFactory:
                 self.mcp_server = registry_server
                 self.mcp_available = True
                 logger.debug(
-                    f"🔄 MCP server refreshed from registry: {registry.active_url}"
+                    "🔄 MCP server refreshed from registry: %s", registry.active_url
                 )
             elif MCP_SERVER_URL and self.mcp_server is None:
                 # Fallback to environment URL if registry is empty
-                self.mcp_server = MCPServerStreamableHTTP(MCP_SERVER_URL)
+                self.mcp_server = MCPServerStreamableHTTP(url=MCP_SERVER_URL)
                 self.mcp_available = True
-                logger.debug(f"🔄 MCP server refreshed from env: {MCP_SERVER_URL}")
+                logger.debug("🔄 MCP server refreshed from env: %s", MCP_SERVER_URL)
             elif not MCP_SERVER_URL and registry_server is None:
                 # No MCP available anywhere
                 self.mcp_server = None
@@ -465,40 +1137,71 @@ class UniversalAgentFactory:
                 logger.debug("🔄 MCP server refresh: No server available")
 
         except Exception as e:
-            logger.warning(f"Failed to refresh MCP server: {e}")
+            logger.warning("Failed to refresh MCP server: %s", e)
             # Keep existing state on error
 
-    async def _ensure_mcp_connection_tested(self):
-        """Ensure MCP connection is tested before use"""
-        if not self._mcp_connection_tested:
-            await self._test_mcp_connection()
-            self._mcp_connection_tested = True
-
-    async def _test_mcp_connection(self):
-        """Test MCP connection using proper Pydantic AI pattern"""
-        try:
-            # Check if MCP server is available
-            if self.mcp_server is None:
-                logger.info("⚠️ MCP server test skipped: No server configured")
-                self.mcp_available = False
-                return
-
-            # Create a simple test agent to verify MCP connectivity
-            test_agent = Agent(
-                model="openai:gpt-4o-mini",
-                system_prompt="You are a connection test agent. Simply respond with 'Connection successful'.",
-                mcp_servers=[self.mcp_server],
+    def _mcp_circuit_open(self) -> bool:
+        """Whether MCP tools are being skipped after repeated failures"""
+        if not self._mcp_cooldown_until:
+            return False
+        if time.monotonic() < self._mcp_cooldown_until:
+            return True
+        self._mcp_cooldown_until = 0.0
+        logger.info("🔌 MCP cool-down over, using MCP tools again")
+        return False
+
+    def _record_mcp_failure(self) -> None:
+        """Count a failed MCP run, opening the circuit on too many in a window"""
+        now = time.monotonic()
+        if now - self._mcp_fail_window_start > _MCP_FAILURE_WINDOW_S:
+            self._mcp_fail_window_start = now
+            self._mcp_fail_count = 0
+        self._mcp_fail_count += 1
+        if self._mcp_fail_count > _MCP_MAX_FAILURES:
+            self._mcp_fail_count = 0
+            self._mcp_cooldown_until = now + _MCP_COOLDOWN_S
+            logger.warning(
+                "⚠️ %d MCP failures within %ss, skipping MCP tools for %ss",
+                _MCP_MAX_FAILURES + 1,
+                _MCP_FAILURE_WINDOW_S,
+                _MCP_COOLDOWN_S,
             )
 
-            # Test connectivity by running the agent with MCP servers
-            async with test_agent.run_mcp_servers():
-                # If we get here, the MCP server connection is working
-                logger.info("✅ MCP server connection successful")
-                self.mcp_available = True
+    async def _probe_mcp(self) -> bool:
+        """Ping the MCP server, reusing the last result for _mcp_probe_ttl seconds"""
+        expires_at, available = self._mcp_probe_cache
+        if time.monotonic() < expires_at:
+            return available
+
+        server = self.mcp_server
+        if server is None:
+            return False
 
+        try:
+            # list_tools opens the session (running the MCP initialize
+            # handshake) and makes one request round-trip on it
+            await server.list_tools()
+            available = True
         except Exception as e:
-            logger.warning(f"❌ MCP server connection failed: {e}")
+            logger.warning("❌ MCP server ping failed: %s", e)
+            available = False
+
+        # Don't cache a result for a server that was swapped mid-probe
+        if server is self.mcp_server:
+            self._mcp_probe_cache = (time.monotonic() + self._mcp_probe_ttl, available)
+        return available
+
+    async def _test_mcp_connection(self):
+        """Test MCP connection with a cached list_tools round-trip"""
+        # Check if MCP server is available
+        if self.mcp_server is None:
+            logger.info("⚠️ MCP server test skipped: No server configured")
             self.mcp_available = False
+            return
+
+        self.mcp_available = await self._probe_mcp()
+        if self.mcp_available:
+            logger.info("✅ MCP server connection successful")
 
     def get_or_create_conversation_context(
         self, repository_name: str
@@ -512,47 +1215,76 @@ class UniversalAgentFactory:
         self, agent_type: AgentType, for_streaming: bool = False
     ) -> Agent:
         """Create agent with MCP integration and conversation context support"""
+        # Without MCP the toolset-free agent serves directly; it is kept across
+        # server swaps, so its output schema is only built once per type
+        if not self._mcp_toolsets or agent_type not in _NEEDS_MCP:
+            return self._toolless_agent(agent_type, for_streaming)
+
+        key = (agent_type, for_streaming)
+        agent = self._agent_cache.get(key)
+        if agent is None:
+            with self._agent_cache_lock:
+                agent = self._agent_cache.get(key)
+                if agent is None:
+                    agent = self._agent_cache[key] = self._build_agent(
+                        agent_type, for_streaming
+                    )
+        return agent
 
+    def _fallback_agent(
+        self, agent: Agent, agent_type: AgentType, for_streaming: bool
+    ) -> Agent:
+        """Agent for running without MCP tools, in place of the MCP-bound agent"""
+        # Without a server the regular agent already has no MCP toolset
+        if self.mcp_server is None:
+            return agent
+        return self._toolless_agent(agent_type, for_streaming)
+
+    def _toolless_agent(self, agent_type: AgentType, for_streaming: bool) -> Agent:
+        """Cached agent built without MCP toolsets"""
+        key = (agent_type, for_streaming)
+        fallback = self._fallback_agents.get(key)
+        if fallback is None:
+            with self._agent_cache_lock:
+                fallback = self._fallback_agents.get(key)
+                if fallback is None:
+                    fallback = self._fallback_agents[key] = self._build_agent(
+                        agent_type, for_streaming, toolsets=()
+                    )
+        return fallback
+
+    def _build_agent(
+        self,
+        agent_type: AgentType,
+        for_streaming: bool,
+        toolsets: Optional[Tuple[CoalescingToolset, ...]] = None,
+    ) -> Agent:
+        """Build a new agent bound to the current MCP server (or given toolsets)"""
+        if toolsets is None:
+            toolsets = self._mcp_toolsets
         # ✅ ENHANCED: Create different agents for streaming vs structured output
         if for_streaming:
             # For streaming, don't use structured output - use plain text
-            if self.mcp_server is not None:
-                agent = Agent(
-                    model="openai:gpt-4o-mini",
-                    deps_type=UniversalDependencies,
-                    system_prompt=self.specializations[agent_type],
-                    mcp_servers=[self.mcp_server],
-                )
-            else:
-                agent = Agent(
-                    model="openai:gpt-4o-mini",
-                    deps_type=UniversalDependencies,
-                    system_prompt=self.specializations[agent_type],
-                )
+            agent = Agent(
+                model="openai:gpt-4o-mini",
+                deps_type=UniversalDependencies,
+                system_prompt=_SPECIALIZATIONS[agent_type],
+                toolsets=toolsets,
+            )
         else:
             # For non-streaming, use structured output
-            if self.mcp_server is not None:
-                agent = Agent(
-                    model="openai:gpt-4o-mini",
-                    deps_type=UniversalDependencies,
-                    output_type=UniversalResult,
-                    system_prompt=self.specializations[agent_type],
-                    mcp_servers=[self.mcp_server],
-                )
-            else:
-                agent = Agent(
-                    model="openai:gpt-4o-mini",
-                    deps_type=UniversalDependencies,
-                    output_type=UniversalResult,
-                    system_prompt=self.specializations[agent_type],
-                )
+            agent = Agent(
+                model="openai:gpt-4o-mini",
+                deps_type=UniversalDependencies,
+                output_type=UniversalResult,
+                system_prompt=_SPECIALIZATIONS[agent_type],
+                toolsets=toolsets,
+            )
 
-        if self.mcp_server is not None:
-            logger.info(f"✅ Created {agent_type} agent with MCP integration")
+        if toolsets:
+            logger.info("✅ Created %s agent with MCP integration", agent_type)
         else:
-            logger.info(
-                f"✅ Created {agent_type} agent without MCP (no server available)"
-            )
+            logger.info("✅ Created %s agent without MCP", agent_type)
         return agent
 
     # ❌ REMOVE: Delete the incorrect tool call interception method
@@ -565,36 +1297,53 @@ class UniversalAgentFactory:
         ✅ CORRECT: Extract entity information from tool calls and results in new_messages
         """
         try:
-            # Track tool calls to match with their results
-            tool_calls_map = {}
+            # Single pass: tool calls always precede their returns, so pending
+            # calls are resolved (and dropped) as soon as the result arrives
+            pending_calls: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+            tool_results: List[Tuple[str, Dict[str, Any], Any]] = []
 
             for message in new_messages:
-                if isinstance(message, ModelRequest):
-                    # Check for tool calls in the message
-                    for part in message.parts:
-                        if isinstance(part, ToolCallPart):
-                            # Store tool call for matching with result
-                            tool_calls_map[part.tool_call_id] = {
-                                "tool_name": part.tool_name,
-                                "args": part.args,
-                            }
-
-                elif isinstance(message, ModelResponse):
-                    # Check for tool results in the response
-                    for part in message.parts:
-                        if isinstance(part, ToolReturnPart):
-                            # Match tool result with tool call
-                            tool_call_info = tool_calls_map.get(part.tool_call_id)
-                            if tool_call_info:
-                                await self._process_tool_result(
-                                    context,
-                                    tool_call_info["tool_name"],
-                                    tool_call_info["args"],
-                                    part.content,
-                                )
+                for part in message.parts:
+                    if isinstance(part, ToolCallPart):
+                        pending_calls[part.tool_call_id] = (
+                            part.tool_name,
+                            part.args_as_dict(),
+                        )
+                    elif isinstance(part, ToolReturnPart):
+                        tool_call_info = pending_calls.pop(part.tool_call_id, None)
+                        if tool_call_info:
+                            tool_name, tool_args = tool_call_info
+                            tool_results.append((tool_name, tool_args, part.content))
+
+            if not tool_results:
+                return
+
+            # repo_get_info replaces the repository_info entry that the
+            # search/QA parsers add to, so those run one at a time in message
+            # order; the remaining parsers are processed concurrently
+            # (bounded). Parsers swallow their own errors. All results from
+            # one run share a single timestamp.
+            semaphore = asyncio.Semaphore(_MAX_TOOL_RESULT_CONCURRENCY)
+            now = datetime.now()
+
+            async def process(tool_result: Tuple[str, Dict[str, Any], Any]) -> None:
+                async with semaphore:
+                    await self._process_tool_result(context, *tool_result, now=now)
+
+            async def process_in_order(
+                ordered: List[Tuple[str, Dict[str, Any], Any]],
+            ) -> None:
+                for tool_result in ordered:
+                    await process(tool_result)
+
+            ordered = [t for t in tool_results if t[0] in _REPOSITORY_INFO_TOOLS]
+            unordered = [t for t in tool_results if t[0] not in _REPOSITORY_INFO_TOOLS]
+            await asyncio.gather(
+                process_in_order(ordered), *(process(t) for t in unordered)
+            )
 
         except Exception as e:
-            logger.warning(f"Failed to extract entities from messages: {e}")
+            logger.warning("Failed to extract entities from messages: %s", e)
 
     async def _process_tool_result(
         self,
@@ -602,50 +1351,38 @@ class UniversalAgentFactory:
         tool_name: str,
         tool_args: Dict[str, Any],
         result_content: str,
+        now: Optional[datetime] = None,
     ) -> None:
         """
         ✅ CORRECT: Process MCP tool results to extract and maintain entity information
         """
         try:
-            if tool_name == "find_entities":
-                # Parse find_entities result to extract entity IDs and information
-                await self._parse_find_entities_result(
-                    context, tool_args, result_content
-                )
-
-            elif tool_name == "search_code":
-                # Parse search_code result for entity references
-                await self._parse_search_code_result(context, tool_args, result_content)
-
-            elif tool_name == "get_entity_relationships":
-                # Parse entity relationships result
-                await self._parse_entity_relationships_result(
-                    context, tool_args, result_content
+            # One timestamp for everything recorded from this tool result
+            if now is None:
+                now = datetime.now()
+            parser = self._tool_result_parsers.get(tool_name)
+            if parser is not None:
+                await parser(
+                    context,
+                    tool_args,
+                    _tool_content_text(result_content),
+                    now.isoformat(),
                 )
 
-            elif tool_name == "repo_get_info":
-                # Parse repository information
-                await self._parse_repo_info_result(context, tool_args, result_content)
-
-            elif tool_name == "qa_codebase":
-                # Parse QA codebase result for entity mentions
-                await self._parse_qa_codebase_result(context, tool_args, result_content)
-
-            context.last_updated = datetime.now()
+            context.last_updated = now
 
         except Exception as e:
-            logger.warning(f"Failed to process tool result for {tool_name}: {e}")
+            logger.warning("Failed to process tool result for %s: %s", tool_name, e)
 
     async def _parse_find_entities_result(
         self,
         context: ConversationContext,
         tool_args: Dict[str, Any],
         result_content: str,
+        now_iso: str,
     ) -> None:
         """Parse find_entities MCP tool result to extract entity IDs"""
         try:
-            import re
-
             # Extract entity IDs from the result using regex patterns
             # Common patterns for entity IDs in MCP responses
             entity_id_patterns = [
@@ -655,10 +1392,21 @@ class UniversalAgentFactory:
                 r"\[([a-f0-9-]{36})\]",  # Bracketed format
             ]
 
-            found_entity_ids = set()
-            for pattern in entity_id_patterns:
-                matches = re.findall(pattern, result_content, re.IGNORECASE)
-                found_entity_ids.update(matches)
+            # Entity IDs past the first _MAX_ENTITY_SCAN_CHARS are vanishingly
+            # rare; bounding the scan keeps regex work flat on huge payloads
+            scan_content = result_content[:_MAX_ENTITY_SCAN_CHARS]
+
+            # Structured (JSON) payloads carry IDs in known fields - use them
+            # directly and only fall back to regex scraping for text results
+            structured = _structured_entities(result_content)
+            if structured:
+                found_entity_ids = set(structured)
+            else:
+                structured = {}
+                found_entity_ids = set()
+                for pattern in entity_id_patterns:
+                    matches = re.findall(pattern, scan_content, re.IGNORECASE)
+                    found_entity_ids.update(matches)
 
             # Extract entity information (name, type, file path, etc.)
             entity_info_patterns = [
@@ -670,23 +1418,31 @@ class UniversalAgentFactory:
             ]
 
             for entity_id in found_entity_ids:
-                if entity_id not in context.valid_entity_ids:
-                    context.valid_entity_ids.append(entity_id)
-
                 # Extract additional entity information
                 entity_info = {
                     "id": entity_id,
-                    "discovered_at": datetime.now().isoformat(),
+                    "discovered_at": now_iso,
                 }
 
-                # Try to extract entity details from surrounding text
-                for pattern in entity_info_patterns:
-                    matches = re.findall(pattern, result_content, re.IGNORECASE)
-                    if matches:
-                        field_name = pattern.split(":")[0].lower().replace("\\s*", "")
-                        entity_info[field_name] = matches[0].strip()
+                entity = structured.get(entity_id)
+                if entity is not None:
+                    # Take entity details straight from the structured payload
+                    entity_info.update(
+                        (field_name, entity[field_name])
+                        for field_name in _ENTITY_INFO_FIELDS
+                        if isinstance(entity.get(field_name), str)
+                    )
+                else:
+                    # Try to extract entity details from surrounding text
+                    for pattern in entity_info_patterns:
+                        matches = re.findall(pattern, scan_content, re.IGNORECASE)
+                        if matches:
+                            field_name = (
+                                pattern.split(":")[0].lower().replace("\\s*", "")
+                            )
+                            entity_info[field_name] = matches[0].strip()
 
-                context.discovered_entities[entity_id] = entity_info
+                context.entity_row(entity_id, now_iso).info = entity_info
 
             # Store repository info
             repo_name = tool_args.get("repo_name", "unknown")
@@ -696,23 +1452,26 @@ class UniversalAgentFactory:
             context.repository_info[repo_name].update(
                 {
                     "entity_discovery": {
-                        "last_discovery": datetime.now().isoformat(),
+                        "last_discovery": now_iso,
                         "entities_found": len(found_entity_ids),
                         "total_entities": len(context.valid_entity_ids),
                     }
                 }
             )
 
-            logger.info(f"Discovered {len(found_entity_ids)} entities for {repo_name}")
+            logger.debug(
+                "Discovered %s entities for %s", len(found_entity_ids), repo_name
+            )
 
         except Exception as e:
-            logger.warning(f"Failed to parse find_entities result: {e}")
+            logger.warning("Failed to parse find_entities result: %s", e)
 
     async def _parse_search_code_result(
         self,
         context: ConversationContext,
         tool_args: Dict[str, Any],
         result_content: str,
+        now_iso: str,
     ) -> None:
         """Parse search_code MCP tool result"""
         try:
@@ -720,65 +1479,63 @@ class UniversalAgentFactory:
             query = tool_args.get("query", "unknown")
 
             # Store search results for future reference
+            # Stored before binding the repository's dict, so a concurrent
+            # repo_get_info replacing it can't strand this entry
+            entry = await _stored_tool_result(result_content, now_iso)
             if repo_name not in context.repository_info:
                 context.repository_info[repo_name] = {}
 
-            if "search_results" not in context.repository_info[repo_name]:
-                context.repository_info[repo_name]["search_results"] = {}
-
-            context.repository_info[repo_name]["search_results"][query] = {
-                "result": result_content[:1000],  # Truncate for storage
-                "timestamp": datetime.now().isoformat(),
-            }
+            search_results = context.repository_info[repo_name].setdefault(
+                "search_results", OrderedDict()
+            )
+            _put_bounded(search_results, query, entry)
 
         except Exception as e:
-            logger.warning(f"Failed to parse search_code result: {e}")
+            logger.warning("Failed to parse search_code result: %s", e)
 
     async def _parse_entity_relationships_result(
         self,
         context: ConversationContext,
         tool_args: Dict[str, Any],
         result_content: str,
+        now_iso: str,
     ) -> None:
         """Parse get_entity_relationships MCP tool result"""
         try:
             entity_id = tool_args.get("entity_id")
             if entity_id:
                 # Store relationship information
-                if entity_id not in context.entity_relationships:
-                    context.entity_relationships[entity_id] = []
-
                 relationship_info = {
-                    "result": result_content[:1000],  # Truncate for storage
-                    "timestamp": datetime.now().isoformat(),
+                    "result": _preview(result_content, _MAX_STORED_RESULT_CHARS),
+                    "timestamp": now_iso,
                     "query_args": tool_args,
                 }
 
-                context.entity_relationships[entity_id].append(relationship_info)
+                context.entity_row(entity_id, now_iso).relationships.append(
+                    relationship_info
+                )
 
                 # Extract any new entity IDs mentioned in relationships
-                import re
-
-                entity_id_pattern = r"([a-f0-9-]{36})"
-                mentioned_ids = re.findall(entity_id_pattern, result_content)
+                mentioned_ids = _ENTITY_ID_RE.findall(result_content)
 
                 for mentioned_id in mentioned_ids:
-                    if mentioned_id not in context.valid_entity_ids:
-                        context.valid_entity_ids.append(mentioned_id)
-                        context.discovered_entities[mentioned_id] = {
+                    row = context.entity_row(mentioned_id, now_iso)
+                    if not row.info:
+                        row.info = {
                             "id": mentioned_id,
                             "discovered_via": "relationship_query",
-                            "discovered_at": datetime.now().isoformat(),
+                            "discovered_at": now_iso,
                         }
 
         except Exception as e:
-            logger.warning(f"Failed to parse entity_relationships result: {e}")
+            logger.warning("Failed to parse entity_relationships result: %s", e)
 
     async def _parse_repo_info_result(
         self,
         context: ConversationContext,
         tool_args: Dict[str, Any],
         result_content: str,
+        now_iso: str,
     ) -> None:
         """Parse repo_get_info MCP tool result"""
         try:
@@ -786,21 +1543,22 @@ class UniversalAgentFactory:
 
             # Store repository information
             context.repository_info[repo_name] = {
-                "info": result_content[:1000],  # Truncate for storage
-                "last_updated": datetime.now().isoformat(),
+                "info": _preview(result_content, _MAX_STORED_RESULT_CHARS),
+                "last_updated": now_iso,
                 "status": (
                     "indexed" if "indexed" in result_content.lower() else "unknown"
                 ),
             }
 
         except Exception as e:
-            logger.warning(f"Failed to parse repo_info result: {e}")
+            logger.warning("Failed to parse repo_info result: %s", e)
 
     async def _parse_qa_codebase_result(
         self,
         context: ConversationContext,
         tool_args: Dict[str, Any],
         result_content: str,
+        now_iso: str,
     ) -> None:
         """Parse qa_codebase MCP tool result for entity mentions"""
         try:
@@ -808,34 +1566,31 @@ class UniversalAgentFactory:
             question = tool_args.get("question", "unknown")
 
             # Store QA results
+            # Stored before binding the repository's dict, so a concurrent
+            # repo_get_info replacing it can't strand this entry
+            entry = await _stored_tool_result(result_content, now_iso)
             if repo_name not in context.repository_info:
                 context.repository_info[repo_name] = {}
 
-            if "qa_results" not in context.repository_info[repo_name]:
-                context.repository_info[repo_name]["qa_results"] = {}
-
-            context.repository_info[repo_name]["qa_results"][question] = {
-                "result": result_content[:1000],  # Truncate for storage
-                "timestamp": datetime.now().isoformat(),
-            }
+            qa_results = context.repository_info[repo_name].setdefault(
+                "qa_results", OrderedDict()
+            )
+            _put_bounded(qa_results, question, entry)
 
             # Extract any entity IDs mentioned in the QA result
-            import re
-
-            entity_id_pattern = r"([a-f0-9-]{36})"
-            mentioned_ids = re.findall(entity_id_pattern, result_content)
+            mentioned_ids = _ENTITY_ID_RE.findall(result_content)
 
             for mentioned_id in mentioned_ids:
-                if mentioned_id not in context.valid_entity_ids:
-                    context.valid_entity_ids.append(mentioned_id)
-                    context.discovered_entities[mentioned_id] = {
+                row = context.entity_row(mentioned_id, now_iso)
+                if not row.info:
+                    row.info = {
                         "id": mentioned_id,
                         "discovered_via": "qa_codebase",
-                        "discovered_at": datetime.now().isoformat(),
+                        "discovered_at": now_iso,
                     }
 
         except Exception as e:
-            logger.warning(f"Failed to parse qa_codebase result: {e}")
+            logger.warning("Failed to parse qa_codebase result: %s", e)
 
     async def _update_context_from_tool_result(
         self,
@@ -847,15 +1602,13 @@ class UniversalAgentFactory:
         """Update conversation context based on tool results (legacy method)"""
         try:
             # Convert result to string for processing
-            result_content = ""
             if hasattr(result, "content") and result.content:
+                first = result.content[0]
                 result_content = (
-                    result.content[0].text
-                    if hasattr(result.content[0], "text")
-                    else str(result.content[0])
+                    first.text if hasattr(first, "text") else _tool_content_text(first)
                 )
             else:
-                result_content = str(result)
+                result_content = _tool_content_text(result)
 
             # Use the new processing method
             await self._process_tool_result(
@@ -863,7 +1616,7 @@ class UniversalAgentFactory:
             )
 
         except Exception as e:
-            logger.warning(f"Failed to update context from tool result: {e}")
+            logger.warning("Failed to update context from tool result: %s", e)
 
     async def execute_agent_with_context(
         self,
@@ -893,67 +1646,94 @@ class UniversalAgentFactory:
         agent = self.create_agent_with_context(agent_type)
 
         try:
-            # Ensure MCP connection is tested before use
-            await self._ensure_mcp_connection_tested()
-
-            logger.info(
-                f"Executing {agent_type} agent with conversation context for {repository_name}"
+            logger.debug(
+                "Executing %s agent with conversation context for %s",
+                agent_type,
+                repository_name,
             )
 
             # ✅ CORRECT: Prepare message_history using proper Pydantic AI pattern
-            message_history = conversation_context.message_history.copy()
-
-            # Add system message with discovered entities context if available
-            if (
-                conversation_context.discovered_entities
-                or conversation_context.valid_entity_ids
-            ):
-                entities_context = f"""
-## Previously Discovered Entities for {repository_name}:
-
-Valid Entity IDs: {conversation_context.valid_entity_ids[:10]}  # Show first 10
-Discovered Entities: {len(conversation_context.discovered_entities)} entities cached
-Entity Relationships: {len(conversation_context.entity_relationships)} relationships cached
+            message_history = self._prepare_message_history(
+                conversation_context, repository_name
+            )
 
-Use these valid entity IDs for relationship queries instead of making new discovery calls.
-"""
-                # ✅ CORRECT: Create proper ModelRequest with system prompt
-                system_message = ModelRequest(
-                    parts=[SystemPromptPart(content=entities_context)]
+            # Identical runs can be answered from the response cache (opt-in,
+            # since a cached answer ignores repository changes)
+            cache_key = None
+            if dependencies.context.get("cache_enabled", False):
+                cache_key = self._response_cache_key(
+                    agent_type, repository_name, message_history, user_query
                 )
-                message_history.append(system_message)
+                cached_result = self._response_cache.get(cache_key)
+                if cached_result is not None:
+                    self._response_cache.move_to_end(cache_key)
+                    logger.debug("Response cache hit for %s agent", agent_type)
+                    return cached_result.model_copy(
+                        update={
+                            "metadata": {**cached_result.metadata, "cache_hit": True},
+                            "conversation_context": conversation_context,
+                        }
+                    )
 
             # ✅ ENHANCED: Execute agent with MCP fallback handling
-            try:
-                async with agent.run_mcp_servers():
-                    result = await agent.run(
-                        user_query, deps=dependencies, message_history=message_history
+            # The time budget is enforced at the event-loop level, so a stalled
+            # model or MCP server cannot hold the request past its deadline
+            time_budget_s = dependencies.tool_budget.time_budget_s
+            result = None
+            if agent_type in _NEEDS_MCP and not self._mcp_circuit_open():
+                try:
+                    async with agent.run_mcp_servers():
+                        result = await asyncio.wait_for(
+                            agent.run(
+                                user_query,
+                                deps=dependencies,
+                                message_history=message_history,
+                            ),
+                            timeout=time_budget_s,
+                        )
+                except asyncio.TimeoutError:
+                    return self._timeout_result(agent_type, time_budget_s)
+                except Exception as mcp_error:
+                    self._record_mcp_failure()
+                    logger.warning(
+                        "MCP server unavailable, running without MCP tools: %s",
+                        mcp_error,
                     )
-            except Exception as mcp_error:
-                logger.warning(
-                    f"MCP server unavailable, running without MCP tools: {mcp_error}"
-                )
+
+            if result is None:
                 # Fallback: Run agent without MCP servers
-                result = await agent.run(
-                    user_query, deps=dependencies, message_history=message_history
-                )
+                fallback_agent = self._fallback_agent(agent, agent_type, False)
+                try:
+                    result = await asyncio.wait_for(
+                        fallback_agent.run(
+                            user_query,
+                            deps=dependencies,
+                            message_history=message_history,
+                        ),
+                        timeout=time_budget_s,
+                    )
+                except asyncio.TimeoutError:
+                    return self._timeout_result(agent_type, time_budget_s)
 
             # ✅ CORRECT: Extract result and update conversation context using RunResult
             agent_result = result.output
 
             # ✅ CORRECT: Use RunResult.new_messages to capture the complete conversation
             # This includes user message, tool calls, tool results, and agent response
-            conversation_context.message_history.extend(result.new_messages)
+            new_messages = result.new_messages()
+            conversation_context.append_messages(new_messages)
 
             # Update discovered entities from tool results in new_messages
             await self._extract_entities_from_messages(
-                conversation_context, result.new_messages
+                conversation_context, new_messages
             )
 
             conversation_context.last_updated = datetime.now()
 
-            # Store updated context in result
-            agent_result.conversation_context = conversation_context
+            # Store updated context in result (shallow copy - result is frozen)
+            agent_result = agent_result.model_copy(
+                update={"conversation_context": conversation_context}
+            )
 
             # Add MCP metadata
             agent_result.metadata.update(
@@ -970,20 +1750,50 @@ Use these valid entity IDs for relationship queries instead of making new discov
                     ),
                     "valid_entity_ids": len(conversation_context.valid_entity_ids),
                     "message_history_length": len(conversation_context.message_history),
-                    "new_messages_count": len(result.new_messages),
+                    "new_messages_count": len(new_messages),
                 }
             )
 
+            # The cached copy drops the live context, which keeps changing and
+            # would otherwise be pinned by the cache; hits attach the current one
+            if cache_key is not None:
+                _put_bounded(
+                    self._response_cache,
+                    cache_key,
+                    agent_result.model_copy(
+                        update={
+                            "metadata": dict(agent_result.metadata),
+                            "conversation_context": None,
+                        }
+                    ),
+                    maxsize=_MAX_CACHED_RESPONSES,
+                )
+
             return agent_result
 
         except Exception as e:
             # ❌ NO FALLBACK: MCP or nothing approach
-            logger.error(f"Agent execution failed for {agent_type}: {e}")
-            logger.error(f"Error details: {type(e).__name__}: {str(e)}")
+            logger.error(
+                "Agent execution failed for %s: %s: %s", agent_type, type(e).__name__, e
+            )
 
             # Re-raise the exception - no fallback mode
             raise RuntimeError(f"MCP agent execution failed: {e}") from e
 
+    def _timeout_result(
+        self, agent_type: AgentType, time_budget_s: float
+    ) -> UniversalResult:
+        """Error result for a run that exceeded its time budget"""
+        logger.error("%s agent timed out after %ss", agent_type, time_budget_s)
+        # Fields are built here, not taken from model output: skip validation
+        return UniversalResult.model_construct(
+            agent_type=agent_type,
+            content=f"Agent execution timed out after {time_budget_s}s",
+            metadata={"error": "timeout", "timeout": True},
+            confidence=0.0,
+            sources=[],
+        )
+
     # Keep backward compatibility
     async def execute_agent(
         self,
@@ -997,7 +1807,72 @@ Use these valid entity IDs for relationship queries instead of making new discov
             agent_type, repository_name, user_query, context
         )
 
-    async def execute_agent_streaming(
+    async def execute_agents_parallel(
+        self,
+        specs: Iterable[Tuple[AgentType, str, str, Optional[Dict[str, Any]]]],
+        max_concurrency: Optional[int] = None,
+    ) -> List[UniversalResult]:
+        """
+        Run several (agent_type, repository_name, user_query, context) specs
+        concurrently, returning results in spec order.
+
+        A failed run yields an error UniversalResult instead of cancelling the
+        batch; max_concurrency optionally bounds how many run at once. The MCP
+        session is opened once for the whole batch, so each run joins it
+        rather than handshaking its own.
+        """
+        specs = list(specs)
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def run(spec):
+            if semaphore is None:
+                return await self.execute_agent(*spec)
+            async with semaphore:
+                return await self.execute_agent(*spec)
+
+        self.refresh_mcp()
+        async with AsyncExitStack() as stack:
+            server = self.mcp_server
+            if (
+                server is not None
+                and not self._mcp_circuit_open()
+                and any(agent_type in _NEEDS_MCP for agent_type, *_ in specs)
+            ):
+                try:
+                    await stack.enter_async_context(server)
+                except Exception as e:
+                    # Each run still falls back on its own
+                    logger.warning("Could not open MCP session for batch: %s", e)
+
+            results = await asyncio.gather(
+                *(run(spec) for spec in specs), return_exceptions=True
+            )
+
+        final_results = []
+        for (agent_type, *_), result in zip(specs, results):
+            if isinstance(result, Exception):
+                logger.error("Agent %s failed: %s", agent_type, result)
+                result = _make_error_result(agent_type, result)
+            final_results.append(result)
+        return final_results
+
+    def execute_agent_streaming(
+        self,
+        agent_type: AgentType,
+        repository_name: str,
+        user_query: str,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Stream an agent run, with heartbeats while it is idle"""
+        # Hand back the heartbeat generator itself rather than re-yielding
+        # from it, so callers iterate it without an extra hop per chunk
+        return _with_heartbeat(
+            self._stream_agent_events(agent_type, repository_name, user_query, context),
+            _STREAM_HEARTBEAT_INTERVAL_S,
+            _HEARTBEAT_EVENT,
+        )
+
+    async def _stream_agent_events(
         self,
         agent_type: AgentType,
         repository_name: str,
@@ -1020,21 +1895,10 @@ Use these valid entity IDs for relationship queries instead of making new discov
         # Get or create conversation context for this repository
         conversation_context = self.get_or_create_conversation_context(repository_name)
 
-        # Initialize tool budget and convergence detector
+        # Initialize tool budget (the dependencies carry it into tools)
         tool_budget = ToolBudget()
         budget_tracker = BudgetTracker()
 
-        # Import and initialize convergence detector
-        from .utils.convergence import ConvergenceDetector, ConvergenceConfig
-
-        convergence_config = ConvergenceConfig(
-            similarity_threshold=tool_budget.convergence_threshold,
-            convergence_ratio=0.7,  # 70% of responses should be similar
-            min_responses=tool_budget.convergence_window,
-            use_critic_model=True,  # Enable AI critic for semantic similarity
-        )
-        convergence_detector = ConvergenceDetector(convergence_config)
-
         dependencies = UniversalDependencies(
             repository_name=repository_name,
             agent_type=agent_type,
@@ -1049,256 +1913,73 @@ Use these valid entity IDs for relationship queries instead of making new discov
         agent = self.create_agent_with_context(agent_type, for_streaming=True)
 
         try:
-            # Ensure MCP connection is tested before use
-            await self._ensure_mcp_connection_tested()
-
-            logger.info(
-                f"Executing {agent_type} agent with enhanced streaming for {repository_name}"
+            logger.debug(
+                "Executing %s agent with enhanced streaming for %s",
+                agent_type,
+                repository_name,
             )
 
             # ✅ CORRECT: Prepare message_history using proper Pydantic AI pattern
-            message_history = conversation_context.message_history.copy()
-
-            # Add system message with discovered entities context if available
-            if (
-                conversation_context.discovered_entities
-                or conversation_context.valid_entity_ids
-            ):
-                entities_context = f"""
-## Previously Discovered Entities for {repository_name}:
-
-Valid Entity IDs: {conversation_context.valid_entity_ids[:10]}  # Show first 10
-Discovered Entities: {len(conversation_context.discovered_entities)} entities cached
-Entity Relationships: {len(conversation_context.entity_relationships)} relationships cached
+            message_history = self._prepare_message_history(
+                conversation_context, repository_name
+            )
 
-Use these valid entity IDs for relationship queries instead of making new discovery calls.
-"""
-                # ✅ CORRECT: Create proper ModelRequest with system prompt
-                system_message = ModelRequest(
-                    parts=[SystemPromptPart(content=entities_context)]
-                )
-                message_history.append(system_message)
+            # Convergence detector is only needed once a stream will actually run
+            convergence_detector = self._make_convergence_detector(tool_budget)
 
             # Don't send start event as text - it creates noise in the conversation
             # The frontend will handle the streaming start indication
 
             # ✅ ENHANCED: Execute agent with streaming and MCP fallback handling
+            # Conditionally use MCP servers only if available and not failing
+            use_mcp = (
+                agent_type in _NEEDS_MCP
+                and self.mcp_server is not None
+                and not self._mcp_circuit_open()
+            )
             try:
-                # Conditionally use MCP servers only if available
-                if self.mcp_server is not None:
-                    async with agent.run_mcp_servers():
-                        async with agent.run_stream(
-                            user_query,
-                            deps=dependencies,
-                            message_history=message_history,
-                        ) as stream_result:
-
-                            accumulated_text = ""
-                            previous_length = 0
-
-                            # Process streaming text as it arrives
-                            async for cumulative_text in stream_result.stream_text():
-                                # Extract only the new delta from cumulative text
-                                new_delta = cumulative_text[previous_length:]
-                                if not new_delta:
-                                    continue  # Skip if no new content
-
-                                previous_length = len(cumulative_text)
-                                accumulated_text = cumulative_text
-
-                                # Check budget limits before processing each chunk
-                                should_stop, stop_reason = budget_tracker.should_stop(
-                                    tool_budget
-                                )
-                                if should_stop:
-                                    # Don't send budget exceeded as text - just break
-                                    break
-
-                                # Check convergence before processing
-                                if (
-                                    len(budget_tracker.recent_responses)
-                                    >= tool_budget.convergence_window
-                                ):
-                                    has_converged = (
-                                        await convergence_detector.has_converged()
-                                    )
-                                    if has_converged:
-                                        # Don't send converged as text - just break
-                                        break
-
-                                # Stream only the new text delta
-                                yield self._format_stream_event(
-                                    "text", {"delta": new_delta}
-                                )
-
-                                # Track response for convergence detection
-                                budget_tracker.add_response(new_delta)
-
-                        # Add final response to convergence tracking
-                        if accumulated_text:
-                            budget_tracker.add_response(accumulated_text)
-                            convergence_detector.add_response(accumulated_text)
-
-                        # Get final result for conversation context update
-                        try:
-                            final_result = await stream_result.get_output()
-
-                            # Update conversation context with new messages
-                            conversation_context.message_history.extend(
-                                stream_result.all_messages()
-                            )
-                            conversation_context.last_updated = datetime.now()
-
-                            # Stream completion event
-                            yield self._format_stream_event(
-                                "done",
-                                {
-                                    "metadata": (
-                                        final_result.metadata
-                                        if hasattr(final_result, "metadata")
-                                        else {}
-                                    ),
-                                    "budget_summary": {
-                                        "tool_calls_made": budget_tracker.tool_calls_made,
-                                        "elapsed_time": budget_tracker.get_elapsed_time(),
-                                        "convergence_detected": len(
-                                            budget_tracker.recent_responses
-                                        )
-                                        >= tool_budget.convergence_window,
-                                    },
-                                },
-                            )
-
-                        except Exception as result_error:
-                            logger.warning(
-                                f"Could not get final result: {result_error}"
-                            )
-                            yield self._format_stream_event(
-                                "done",
-                                {
-                                    "content": accumulated_text,
-                                    "metadata": {"partial_result": True},
-                                    "budget_summary": {
-                                        "tool_calls_made": budget_tracker.tool_calls_made,
-                                        "elapsed_time": budget_tracker.get_elapsed_time(),
-                                    },
-                                },
+                # The stack closes the run stream before the MCP session it
+                # uses, including when the consumer stops iterating early
+                async with AsyncExitStack() as stack:
+                    if use_mcp:
+                        await stack.enter_async_context(agent.run_mcp_servers())
+                        run_agent = agent
+                    else:
+                        # No MCP server available - run streaming without MCP
+                        logger.debug(
+                            "Running %s agent streaming without MCP tools", agent_type
+                        )
+                        run_agent = self._fallback_agent(agent, agent_type, True)
+                    events = await stack.enter_async_context(
+                        aclosing(
+                            self._stream_run(
+                                run_agent,
+                                user_query,
+                                dependencies,
+                                message_history,
+                                convergence_detector,
+                                track_final_response=use_mcp,
                             )
-
-                else:
-                    # No MCP server available - run streaming without MCP
-                    logger.info(
-                        f"Running {agent_type} agent streaming without MCP tools"
+                        )
                     )
-                    async with agent.run_stream(
-                        user_query,
-                        deps=dependencies,
-                        message_history=message_history,
-                    ) as stream_result:
-
-                        accumulated_text = ""
-                        previous_length = 0
-
-                        # Process streaming text as it arrives
-                        async for cumulative_text in stream_result.stream_text():
-                            # Extract only the new delta from cumulative text
-                            new_delta = cumulative_text[previous_length:]
-                            if not new_delta:
-                                continue  # Skip if no new content
-
-                            previous_length = len(cumulative_text)
-                            accumulated_text = cumulative_text
-
-                            # Check budget limits before processing each chunk
-                            should_stop, stop_reason = budget_tracker.should_stop(
-                                tool_budget
-                            )
-                            if should_stop:
-                                # Don't send budget exceeded as text - just break
-                                break
-
-                            # Check convergence before processing
-                            if (
-                                len(budget_tracker.recent_responses)
-                                >= tool_budget.convergence_window
-                            ):
-                                has_converged = (
-                                    await convergence_detector.has_converged()
-                                )
-                                if has_converged:
-                                    # Don't send converged as text - just break
-                                    break
-
-                            # Stream only the new text delta
-                            yield self._format_stream_event(
-                                "text", {"delta": new_delta}
-                            )
-
-                            # Track response for convergence detection
-                            budget_tracker.add_response(new_delta)
-
-                        # Get final result and update conversation context
-                        try:
-                            final_result = await stream_result.get_output()
-
-                            # Update conversation context with new messages
-                            conversation_context.message_history.extend(
-                                stream_result.all_messages()
-                            )
-                            conversation_context.last_updated = datetime.now()
-
-                            # Stream completion event
-                            yield self._format_stream_event(
-                                "done",
-                                {
-                                    "metadata": (
-                                        final_result.metadata
-                                        if hasattr(final_result, "metadata")
-                                        else {}
-                                    ),
-                                    "budget_summary": {
-                                        "tool_calls_made": budget_tracker.tool_calls_made,
-                                        "elapsed_time": budget_tracker.get_elapsed_time(),
-                                        "convergence_detected": len(
-                                            budget_tracker.recent_responses
-                                        )
-                                        >= tool_budget.convergence_window,
-                                    },
-                                },
-                            )
-
-                        except Exception as result_error:
-                            logger.warning(
-                                f"Could not get final result: {result_error}"
-                            )
-                            yield self._format_stream_event(
-                                "done",
-                                {
-                                    "content": accumulated_text,
-                                    "metadata": {"partial_result": True},
-                                    "budget_summary": {
-                                        "tool_calls_made": budget_tracker.tool_calls_made,
-                                        "elapsed_time": budget_tracker.get_elapsed_time(),
-                                    },
-                                },
-                            )
+                    async for event in events:
+                        yield event
 
             except Exception as mcp_error:
+                if use_mcp:
+                    self._record_mcp_failure()
                 logger.warning(
-                    f"MCP server unavailable for streaming, running without MCP tools: {mcp_error}"
+                    "MCP server unavailable for streaming, running without MCP tools: %s",
+                    mcp_error,
                 )
                 # Don't send MCP unavailable messages as text - they create noise
                 # The system should handle MCP unavailability gracefully without user-facing errors
-                yield self._format_stream_event(
-                    "done",
-                    {
-                        "metadata": {"mcp_fallback": True},
-                        "budget_summary": {"tool_calls_made": 0, "elapsed_time": 0},
-                    },
-                )
+                yield self._fallback_done_event()
 
         except Exception as e:
-            logger.warning(f"Enhanced streaming execution failed for {agent_type}: {e}")
+            logger.warning(
+                "Enhanced streaming execution failed for %s: %s", agent_type, e
+            )
 
             # Stream error event
             yield self._format_stream_event(
@@ -1316,14 +1997,7 @@ Use these valid entity IDs for relationship queries instead of making new discov
                     agent_type, repository_name, user_query, context
                 )
                 yield self._format_stream_event("text", {"delta": result.content})
-                yield self._format_stream_event(
-                    "done",
-                    {
-                        "content": result.content,
-                        "metadata": result.metadata,
-                        "fallback": True,
-                    },
-                )
+                yield self._fallback_done_event()
             except Exception as fallback_error:
                 yield self._format_stream_event(
                     "error",
@@ -1333,6 +2007,139 @@ Use these valid entity IDs for relationship queries instead of making new discov
                     },
                 )
 
+    async def _stream_run(
+        self,
+        agent: Agent,
+        user_query: str,
+        dependencies: UniversalDependencies,
+        message_history: List[ModelMessage],
+        convergence_detector: ConvergenceDetector,
+        track_final_response: bool = False,
+    ) -> AsyncGenerator[str, None]:
+        """Stream one agent run's text deltas, then its completion event"""
+        conversation_context = dependencies.conversation_context
+        tool_budget = dependencies.tool_budget
+        budget_tracker = dependencies.budget_tracker
+
+        async with agent.run_stream(
+            user_query,
+            deps=dependencies,
+            message_history=message_history,
+        ) as stream_result:
+
+            text_parts: List[str] = []
+            # Start of the sentence/line not yet given to budget_tracker
+            segment_start = 0
+
+            # Deltas are forwarded as they arrive; the default 0.1s debounce
+            # would hold back the first token
+            async for new_delta in stream_result.stream_text(
+                delta=True, debounce_by=None
+            ):
+                if not new_delta:
+                    continue  # Skip if no new content
+
+                text_parts.append(new_delta)
+
+                # Check budget limits before processing each chunk
+                should_stop, stop_reason = budget_tracker.should_stop(tool_budget)
+                if should_stop:
+                    # Don't send budget exceeded as text - just break
+                    break
+
+                # Check convergence before processing (the detector answers
+                # from its last result until it has a new response)
+                if (
+                    len(budget_tracker.recent_responses)
+                    >= tool_budget.convergence_window
+                ):
+                    has_converged = await convergence_detector.has_converged()
+                    if has_converged:
+                        # Don't send converged as text - just break
+                        break
+
+                # Stream only the new text delta
+                yield self._format_stream_event("text", {"delta": new_delta})
+
+                # Track completed sentences/lines for convergence detection
+                if _SEGMENT_END_RE.search(new_delta):
+                    segment = "".join(text_parts[segment_start:]).strip()
+                    segment_start = len(text_parts)
+                    if segment:
+                        budget_tracker.add_response(segment)
+
+        accumulated_text = "".join(text_parts)
+
+        # Add final response to convergence tracking
+        if track_final_response and accumulated_text:
+            budget_tracker.add_response(accumulated_text)
+            convergence_detector.add_response(accumulated_text)
+
+        # Get final result for conversation context update
+        try:
+            final_result = await stream_result.get_output()
+
+            # Update conversation context with new messages, and pick
+            # up entities from this run's tool results in the same pass
+            # the non-streaming path makes
+            new_messages = stream_result.new_messages()
+            conversation_context.append_messages(new_messages)
+            await self._extract_entities_from_messages(
+                conversation_context, new_messages
+            )
+            conversation_context.last_updated = datetime.now()
+
+            # Stream completion event
+            yield self._format_stream_event(
+                "done",
+                {
+                    "metadata": (
+                        final_result.metadata
+                        if hasattr(final_result, "metadata")
+                        else {}
+                    ),
+                    "budget_summary": {
+                        "tool_calls_made": budget_tracker.tool_calls_made,
+                        "elapsed_time": budget_tracker.get_elapsed_time(),
+                        "convergence_detected": len(budget_tracker.recent_responses)
+                        >= tool_budget.convergence_window,
+                    },
+                },
+            )
+
+        except Exception as result_error:
+            logger.warning("Could not get final result: %s", result_error)
+            yield self._format_stream_event(
+                "done",
+                {
+                    "content": accumulated_text,
+                    "metadata": {"partial_result": True},
+                    "budget_summary": {
+                        "tool_calls_made": budget_tracker.tool_calls_made,
+                        "elapsed_time": budget_tracker.get_elapsed_time(),
+                    },
+                },
+            )
+
+    def _fallback_done_event(self) -> str:
+        """End-of-stream event for fallback runs that made no tool calls"""
+        # Only the tool call count reaches the V5 frame, so it is constant
+        if self._cached_fallback_done_event is None:
+            self._cached_fallback_done_event = self._format_stream_event(
+                "done", {"budget_summary": {"tool_calls_made": 0}}
+            )
+        return self._cached_fallback_done_event
+
+    def _make_convergence_detector(
+        self, tool_budget: ToolBudget
+    ) -> ConvergenceDetector:
+        """Convergence detector matching the streaming run's tool budget"""
+        return ConvergenceDetector(
+            _convergence_config(
+                tool_budget.convergence_threshold, tool_budget.convergence_window
+            )
+        )
+
     def _format_stream_event(self, event_type: str, data: Dict[str, Any]) -> str:
         """
         Format streaming events for AI SDK V5 compatibility.
@@ -1347,19 +2154,21 @@ Use these valid entity IDs for relationship queries instead of making new discov
         - error: Error occurred (as text)
         - done: Streaming completed (as end-of-stream)
         """
+        if event_type == "text":
+            # Use V5 text streaming format. Per-token hot path: only the delta
+            # is encoded (same output as build_text_stream)
+            delta = json.dumps(data.get("delta", ""), ensure_ascii=False)
+            return f"{_TEXT_EVENT_PREFIX}{delta}}}\n"
+
+        # Imported lazily: api.utils.models pulls in the database layer
         from api.utils.models import (
             build_text_stream,
             build_tool_call_partial,
             build_tool_call_result,
             build_end_of_stream_message,
         )
-        import json
 
-        if event_type == "text":
-            # Use V5 text streaming format
-            return build_text_stream(data.get("delta", ""))
-
-        elif event_type == "toolCall":
+        if event_type == "toolCall":
             # Use V5 tool call format
             return build_tool_call_partial(
                 tool_call_id=data.get("id", "unknown"),
@@ -1412,13 +2221,13 @@ Use these valid entity IDs for relationship queries instead of making new discov
 
     def get_agent_description(self, agent_type: AgentType) -> str:
         """Get description for a specific agent type"""
-        return self.specializations.get(agent_type, "Unknown agent type")
+        return _SPECIALIZATIONS.get(agent_type, "Unknown agent type")
 
     def clear_conversation_context(self, repository_name: str) -> None:
         """Clear conversation context for a specific repository"""
         if repository_name in self.conversation_contexts:
             del self.conversation_contexts[repository_name]
-            logger.info(f"Cleared conversation context for {repository_name}")
+            logger.info("Cleared conversation context for %s", repository_name)
 
     def get_conversation_summary(self, repository_name: str) -> Dict[str, Any]:
         """Get summary of conversation context for a repository"""
@@ -1436,6 +2245,10 @@ Use these valid entity IDs for relationship queries instead of making new discov
             "last_updated": context.last_updated.isoformat(),
         }
 
+    def _summarize_contexts(self, repositories: List[str]) -> Dict[str, Any]:
+        """Conversation summaries for the given repositories"""
+        return {repo: self.get_conversation_summary(repo) for repo in repositories}
+
     async def test_mcp_connection(self) -> Dict[str, Any]:
         """
         ✅ CORRECT: Test MCP connection with proper Pydantic AI patterns
@@ -1465,9 +2278,8 @@ Use these valid entity IDs for relationship queries instead of making new discov
                     "integration_status": "MCP server not initialized",
                 }
 
-            # Test basic MCP connection
-            if not self.mcp_available:
-                await self._test_mcp_connection()
+            # MCP round-trip only; a full agent run here costs a model call
+            await self._test_mcp_connection()
 
             if not self.mcp_available:
                 return {
@@ -1480,56 +2292,31 @@ Use these valid entity IDs for relationship queries instead of making new discov
                     "integration_status": "Native Pydantic AI MCP support",
                 }
 
-            # Test with a simple agent execution
-            test_agent = self.create_agent_with_context(AgentType.SIMPLIFIER)
-            test_dependencies = UniversalDependencies(
-                repository_name="test_repo",
-                agent_type=AgentType.SIMPLIFIER,
-                user_query="Test MCP integration",
-                context={},
-            )
-
-            # ✅ CORRECT: Test agent execution with proper result handling
-            result = await test_agent.run("Test MCP connection", deps=test_dependencies)
-
             return {
                 "mcp_server_url": MCP_SERVER_URL,
                 "connection_test": "success",
                 "integration_type": "Native Pydantic AI",
                 "version_status": "FastMCP 2.9 - Version Matched",
-                "test_result": "MCP integration working via Pydantic AI",
+                "test_result": "MCP server answered ping",
                 "client_version": "2.10.0",
                 "server_version": "2.9",
                 "integration_status": "Native Pydantic AI MCP support",
-                "agent_response": (
-                    str(result.output)[:200] + "..."
-                    if len(str(result.output)) > 200
-                    else str(result.output)
-                ),
             }
 
         except Exception as e:
             error_message = str(e)
             error_type = type(e).__name__
 
-            suggestions = [
-                "Check if FastMCP server is running on port 8009",
-                "Verify FastMCP 2.10.0 is installed correctly",
-                "Check network connectivity to localhost:8009/sse/",
-                "Restart the MCP server if needed",
-                "Ensure OpenAI API key is configured for test agent",
-            ]
+            suggestions = list(_BASE_SUGGESTIONS)
 
-            if "connection" in error_message.lower():
-                suggestions.append("Server may not be running or accessible")
-            elif "version" in error_message.lower():
-                suggestions.append(
-                    "Version mismatch - ensure client and server compatibility"
-                )
-            elif "api" in error_message.lower():
-                suggestions.append("Check OpenAI API configuration")
+            # First matching keyword wins, in priority order
+            error_lower = error_message.lower()
+            for keyword, suggestion in _KEYWORD_SUGGESTIONS.items():
+                if keyword in error_lower:
+                    suggestions.append(suggestion)
+                    break
 
-            logger.error(f"MCP connection test failed: {error_message}")
+            logger.error("MCP connection test failed: %s", error_message)
 
             return {
                 "mcp_server_url": MCP_SERVER_URL,
@@ -1548,6 +2335,15 @@ Use these valid entity IDs for relationship queries instead of making new discov
         """
         Comprehensive health check for the Universal Agent Factory
         """
+        # Independent probes run concurrently; one failing doesn't sink the report
+        mcp_test_result, context_summaries = await asyncio.gather(
+            self.test_mcp_connection(),
+            asyncio.to_thread(
+                self._summarize_contexts, list(self.conversation_contexts)
+            ),
+            return_exceptions=True,
+        )
+
         health_status = {
             "factory_status": "healthy",
             "agent_types_available": len(self.get_available_agent_types()),
@@ -1557,28 +2353,29 @@ Use these valid entity IDs for relationship queries instead of making new discov
             "mcp_status": "unknown",
             "mcp_details": {},
             "conversation_contexts": len(self.conversation_contexts),
-            "context_summaries": {
-                repo: self.get_conversation_summary(repo)
-                for repo in self.conversation_contexts.keys()
-            },
+            "context_summaries": (
+                {"error": str(context_summaries)}
+                if isinstance(context_summaries, Exception)
+                else context_summaries
+            ),
             "timestamp": datetime.now().isoformat(),
         }
 
-        # Test MCP connection
-        try:
-            mcp_test_result = await self.test_mcp_connection()
-            if mcp_test_result["connection_test"] == "success":
-                health_status["mcp_status"] = "healthy"
-                self.mcp_available = True
-            else:
-                health_status["mcp_status"] = "degraded"
-                self.mcp_available = False
-
-            health_status["mcp_details"] = mcp_test_result
-
-        except Exception as e:
+        # MCP connection result
+        if isinstance(mcp_test_result, Exception):
             health_status["mcp_status"] = "failed"
-            health_status["mcp_details"] = {"error": str(e), "client_type": "fastmcp"}
+            health_status["mcp_details"] = {
+                "error": str(mcp_test_result),
+                "client_type": "fastmcp",
+            }
+            self.mcp_available = False
+        elif mcp_test_result["connection_test"] == "success":
+            health_status["mcp_status"] = "healthy"
+            health_status["mcp_details"] = mcp_test_result
+            self.mcp_available = True
+        else:
+            health_status["mcp_status"] = "degraded"
+            health_status["mcp_details"] = mcp_test_result
             self.mcp_available = False
 
         # Overall status determination
@@ -1590,13 +2387,17 @@ Use these valid entity IDs for relationship queries instead of making new discov
 
 # Global factory instance - singleton pattern for efficiency
 _factory_instance: Optional[UniversalAgentFactory] = None
+_factory_lock = threading.Lock()
 
 
 def get_universal_factory() -> UniversalAgentFactory:
     """Get or create the global UniversalAgentFactory instance"""
     global _factory_instance
     if _factory_instance is None:
-        _factory_instance = UniversalAgentFactory()
+        # Double-checked so concurrent first callers share one factory
+        with _factory_lock:
+            if _factory_instance is None:
+                _factory_instance = UniversalAgentFactory()
     return _factory_instance
 
 
@@ -1612,7 +2413,7 @@ async def execute_agent(
     return await factory.execute_agent(agent_type, repository_name, user_query, context)
 
 
-async def execute_agent_streaming(
+def execute_agent_streaming(
     agent_type: AgentType,
     repository_name: str,
     user_query: str,
@@ -1620,7 +2421,6 @@ async def execute_agent_streaming(
 ) -> AsyncGenerator[str, None]:
     """Execute agent with streaming using the global factory instance"""
     factory = get_universal_factory()
-    async for chunk in factory.execute_agent_streaming(
+    return factory.execute_agent_streaming(
         agent_type, repository_name, user_query, context
-    ):
-        yield chunk
+    )
@@ -19,8 +19,14 @@ from https://ai.pydantic.dev/llms-full.txt
 """
 
 import asyncio
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+import math
+from array import array
+from bisect import insort
+import time
+from datetime import datetime
+from itertools import combinations, count
+from operator import attrgetter
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
 from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
 import logging
@@ -29,17 +35,53 @@ import logging
 from pydantic_ai import Agent
 from pydantic_ai.models import Model
 
+from ...utils.openai_client import get_openai_client
+
 logger = logging.getLogger(__name__)
 
+# Marks a critic agent that has not been built yet
+_CRITIC_UNSET: Any = object()
+
+# Characters of each response shown to the AI critic, to bound prompt size
+_CRITIC_TEXT_CHARS = 1000
+
+# How many analysis windows of responses a detector retains
+_RESPONSE_WINDOWS_KEPT = 4
+
+# Convergence signals and their weights in the final decision (similarity
+# matters most), and the weighted score needed to call a run converged
+_SIGNAL_NAMES = ("similarity", "confidence", "stability", "quality")
+_SIGNAL_WEIGHTS = (0.4, 0.25, 0.2, 0.15)
+_CONVERGENCE_THRESHOLD = 0.6
+
+# Stable per-entry ids for the similarity cache; unlike id(), never reused
+_response_ids = count()
+
+# Bound on cached pair similarities, in squared analysis windows
+_CACHED_PAIR_WINDOWS = 4
+
 
 @dataclass
 class ResponseEntry:
     """Single response entry for convergence analysis."""
 
     content: str
-    timestamp: datetime
+    timestamp: float  # epoch seconds (time.time())
     confidence: float = 0.8
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # Normalized word set, computed once so pairwise checks reuse it
+    tokens: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    # Prefix of content sent to the AI critic, sliced once per entry
+    critic_text: str = field(init=False, repr=False, compare=False)
+    # int8-quantized embedding of critic_text and its norm, filled in when
+    # first needed
+    embedding: Optional[array] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    embedding_norm: float = field(default=0.0, init=False, repr=False, compare=False)
+    seq_id: int = field(
+        init=False, repr=False, compare=False, default_factory=_response_ids.__next__
+    )
 
     def __post_init__(self):
         """Validate response entry data."""
@@ -47,6 +89,34 @@ class ResponseEntry:
             raise ValueError("Response content cannot be empty")
         if not 0.0 <= self.confidence <= 1.0:
             raise ValueError("Confidence must be between 0.0 and 1.0")
+        self.tokens = frozenset(self.content.lower().split())
+        self.critic_text = self.content[:_CRITIC_TEXT_CHARS]
+
+    @property
+    def iso_timestamp(self) -> str:
+        """Timestamp as an ISO 8601 string, for reporting."""
+        return datetime.fromtimestamp(self.timestamp).isoformat()
+
+
+def _quantize_embedding(vector: List[float]) -> Optional[Tuple[array, float]]:
+    """Symmetric int8 quantization of a vector, with the quantized norm."""
+    # Cosine is scale-invariant, so only the int8 codes and their norm are
+    # kept: a quarter of float32 storage, a tiny fraction of a float tuple
+    peak = max(map(abs, vector), default=0.0)
+    if not peak:
+        return None
+    scale = 127 / peak
+    codes = array("b", [round(x * scale) for x in vector])
+    return codes, math.hypot(*codes)
+
+
+def _token_jaccard(words1: FrozenSet[str], words2: FrozenSet[str]) -> float:
+    """Jaccard similarity of two word sets."""
+    if not words1 or not words2:
+        return 0.0
+    # |A ∪ B| = |A| + |B| - |A ∩ B|, so no union set is built
+    shared = len(words1 & words2)
+    return shared / (len(words1) + len(words2) - shared)
 
 
 class SimilarityMetrics(BaseModel):
@@ -63,6 +133,9 @@ class SimilarityMetrics(BaseModel):
     )
     quality: float = Field(ge=0.0, le=1.0, description="Overall quality assessment")
 
+    # Scores are read-only once the critic's output is validated
+    model_config = {"frozen": True}
+
 
 class ConvergenceConfig(BaseModel):
     """Configuration for convergence detection behavior."""
@@ -119,6 +192,17 @@ class ConvergenceConfig(BaseModel):
         le=1.0,
         description="Weight for critic vs Jaccard similarity",
     )
+    embedding_model: Optional[str] = Field(
+        default=None,
+        description=(
+            "Embedding model for semantic similarity; when set, cosine similarity "
+            "of cached response embeddings replaces the AI critic"
+        ),
+    )
+
+    # Configuration object - immutable once created, so one instance can be
+    # shared by every detector built with the same settings
+    model_config = {"frozen": True}
 
     def model_post_init(self, __context):
         """Validate configuration constraints."""
@@ -126,6 +210,9 @@ class ConvergenceConfig(BaseModel):
             raise ValueError("window_size must be >= min_responses")
 
 
+_DEFAULT_CONFIG = ConvergenceConfig()
+
+
 class ConvergenceDetector:
     """
     Advanced convergence detection for agent responses.
@@ -145,14 +232,35 @@ class ConvergenceDetector:
 
     def __init__(self, config: Optional[ConvergenceConfig] = None):
         """Initialize convergence detector with optional configuration."""
-        self.config = config or ConvergenceConfig()
+        self.config = config or _DEFAULT_CONFIG
         self.responses: List[ResponseEntry] = []
+        # Only the newest window_size responses are analyzed; a few windows
+        # are kept for analysis output and the rest dropped as they arrive
+        self._max_responses = self.config.window_size * _RESPONSE_WINDOWS_KEPT
         self.similarity_cache: Dict[Tuple[int, int], float] = {}
-        self.last_convergence_check: Optional[datetime] = None
+        self.last_convergence_check: Optional[float] = None
         self.convergence_history: List[bool] = []
 
-        # Initialize AI critic for semantic similarity
-        self._init_critic_agent()
+        # Whether responses changed since the last completed check, and that
+        # check's outcome; an unchanged window is not re-evaluated
+        self._dirty = True
+        self._last_result = False
+
+        # AI critic for semantic similarity, built on first use
+        self._critic_agent: Optional[Agent] = _CRITIC_UNSET
+        # Embeddings client, used instead of the critic when configured
+        self._embedding_client: Optional[Any] = None
+
+    @property
+    def critic_agent(self) -> Optional[Agent]:
+        """AI critic agent, or None when disabled or unavailable."""
+        if self._critic_agent is _CRITIC_UNSET:
+            self._init_critic_agent()
+        return self._critic_agent
+
+    @critic_agent.setter
+    def critic_agent(self, agent: Optional[Agent]) -> None:
+        self._critic_agent = agent
 
     def _init_critic_agent(self) -> None:
         """Initialize the AI critic agent for semantic similarity evaluation."""
@@ -203,21 +311,29 @@ Be precise and consider both surface-level and deep semantic similarities.""",
             confidence: Confidence score for this response
             metadata: Optional metadata about the response
         """
+        now = time.time()
         entry = ResponseEntry(
             content=content,
-            timestamp=datetime.now(),
+            timestamp=now,
             confidence=confidence,
             metadata=metadata or {},
         )
 
-        self.responses.append(entry)
+        # Keep responses in timestamp order even if the wall clock steps back
+        if self.responses and entry.timestamp < self.responses[-1].timestamp:
+            insort(self.responses, entry, key=attrgetter("timestamp"))
+        else:
+            self.responses.append(entry)
+        if len(self.responses) > self._max_responses:
+            del self.responses[0]
+        self._dirty = True
         logger.debug(
             f"Added response to convergence detector. Total responses: {len(self.responses)}"
         )
 
         # Clean up old responses periodically
         if len(self.responses) % 5 == 0:
-            self._cleanup_old_responses()
+            self._cleanup_old_responses(now)
 
     async def has_converged(self, force_check: bool = False) -> bool:
         """
@@ -229,18 +345,27 @@ Be precise and consider both surface-level and deep semantic similarities.""",
         Returns:
             True if convergence detected, False otherwise
         """
-        # Rate limiting check
-        if not force_check and self._should_skip_check():
-            return False
+        # Nothing new to evaluate since the last check
+        if not force_check and not self._dirty:
+            return self._last_result
 
-        # Minimum response requirement
+        # Minimum response requirement; stays unmet until a response is added
         if len(self.responses) < self.config.min_responses:
+            self._dirty = False
+            self._last_result = False
+            return False
+
+        # One clock read serves every time comparison in this check
+        now = time.time()
+
+        # Rate limiting check
+        if not force_check and self._should_skip_check(now):
             return False
 
-        self.last_convergence_check = datetime.now()
+        self.last_convergence_check = now
 
         # Get recent responses for analysis
-        recent_responses = self._get_recent_responses()
+        recent_responses = self._get_recent_responses(now)
         if len(recent_responses) < self.config.min_responses:
             return False
 
@@ -249,6 +374,8 @@ Be precise and consider both surface-level and deep semantic similarities.""",
 
         # Make convergence decision
         has_converged = self._make_convergence_decision(signals)
+        self._dirty = False
+        self._last_result = has_converged
 
         # Track convergence history
         self.convergence_history.append(has_converged)
@@ -288,7 +415,7 @@ Be precise and consider both surface-level and deep semantic similarities.""",
             "convergence_decision": self._make_convergence_decision(signals),
             "convergence_history": self.convergence_history,
             "last_check": (
-                self.last_convergence_check.isoformat()
+                datetime.fromtimestamp(self.last_convergence_check).isoformat()
                 if self.last_convergence_check
                 else None
             ),
@@ -298,7 +425,7 @@ Be precise and consider both surface-level and deep semantic similarities.""",
                     "content_preview": (
                         r.content[:100] + "..." if len(r.content) > 100 else r.content
                     ),
-                    "timestamp": r.timestamp.isoformat(),
+                    "timestamp": r.iso_timestamp,
                     "confidence": r.confidence,
                     "metadata": r.metadata,
                 }
@@ -312,23 +439,23 @@ Be precise and consider both surface-level and deep semantic similarities.""",
         self.similarity_cache.clear()
         self.convergence_history.clear()
         self.last_convergence_check = None
+        self._dirty = True
+        self._last_result = False
         logger.info("Convergence detector reset")
 
-    def _get_recent_responses(self) -> List[ResponseEntry]:
+    def _get_recent_responses(self, now: Optional[float] = None) -> List[ResponseEntry]:
         """Get recent responses within the configured window."""
         if not self.responses:
             return []
 
-        # Sort by timestamp (most recent first)
-        sorted_responses = sorted(
-            self.responses, key=lambda r: r.timestamp, reverse=True
-        )
-
-        # Take the most recent responses up to window_size
-        recent = sorted_responses[: self.config.window_size]
+        # responses is kept in timestamp order, so the most recent up to
+        # window_size are its tail (most recent first)
+        recent = self.responses[-self.config.window_size :][::-1]
 
         # Filter by age
-        cutoff_time = datetime.now() - timedelta(minutes=self.config.max_age_minutes)
+        if now is None:
+            now = time.time()
+        cutoff_time = now - self.config.max_age_minutes * 60
         return [r for r in recent if r.timestamp >= cutoff_time]
 
     async def _calculate_convergence_signals(
@@ -340,14 +467,12 @@ Be precise and consider both surface-level and deep semantic similarities.""",
         # Traditional similarity check
         signals["similarity"] = await self._check_similarity_convergence(responses)
 
-        # Confidence-based signals
-        signals["confidence"] = self._check_confidence_convergence(responses)
-
-        # Temporal stability
-        signals["stability"] = self._check_temporal_stability(responses)
-
-        # Quality threshold
-        signals["quality"] = self._check_quality_threshold(responses)
+        # Confidence, temporal stability and quality thresholds
+        (
+            signals["confidence"],
+            signals["stability"],
+            signals["quality"],
+        ) = self._check_response_signals(responses)
 
         return signals
 
@@ -358,129 +483,143 @@ Be precise and consider both surface-level and deep semantic similarities.""",
         if len(responses) < 2:
             return 0.0
 
-        similarities = []
-        for i in range(len(responses)):
-            for j in range(i + 1, len(responses)):
-                similarity = await self._calculate_similarity(
-                    responses[i], responses[j]
-                )
-                similarities.append(similarity)
+        # Pairs that cannot reach the threshold count as dissimilar without
+        # being scored, which spares their critic calls
+        threshold = self.config.similarity_threshold
+        pairs = list(combinations(responses, 2))
+        candidates = [
+            (response1, response2)
+            for response1, response2 in pairs
+            if self._similarity_upper_bound(response1, response2) >= threshold
+        ]
+
+        # Embeddings are fetched in one request for every scored response
+        if self.config.embedding_model and candidates:
+            await self._embed_responses(
+                {r.seq_id: r for pair in candidates for r in pair}
+            )
 
-        if not similarities:
-            return 0.0
+        # Pairs are scored concurrently so critic round-trips overlap; cached
+        # pairs return without awaiting anything
+        similarities = await asyncio.gather(
+            *(
+                self._calculate_similarity(response1, response2)
+                for response1, response2 in candidates
+            )
+        )
 
         # Calculate ratio of similarities above threshold
-        above_threshold = sum(
-            1 for s in similarities if s >= self.config.similarity_threshold
-        )
-        ratio = above_threshold / len(similarities)
+        above_threshold = sum(1 for s in similarities if s >= threshold)
+        ratio = above_threshold / len(pairs)
 
         return ratio
 
-    def _check_confidence_convergence(self, responses: List[ResponseEntry]) -> float:
-        """Check convergence based on confidence stability."""
-        if len(responses) < 2:
-            return 0.0
-
-        confidences = [r.confidence for r in responses]
-        mean_confidence = sum(confidences) / len(confidences)
-
-        # Check if all confidences are above minimum
-        if mean_confidence < self.config.min_confidence:
-            return 0.0
-
-        # Calculate confidence stability (low variance = high stability)
-        variance = sum((c - mean_confidence) ** 2 for c in confidences) / len(
-            confidences
-        )
-        stability = max(0.0, 1.0 - variance * 10)  # Scale variance to 0-1 range
-
-        return stability
-
-    def _check_temporal_stability(self, responses: List[ResponseEntry]) -> float:
-        """Check convergence based on temporal patterns."""
-        if len(responses) < 2:
-            return 0.0
-
-        # Sort by timestamp
-        sorted_responses = sorted(responses, key=lambda r: r.timestamp)
+    def _similarity_upper_bound(
+        self, response1: ResponseEntry, response2: ResponseEntry
+    ) -> float:
+        """Highest score _calculate_similarity could give this pair."""
+        # Jaccard can be at most |smaller set| / |larger set|
+        len1, len2 = len(response1.tokens), len(response2.tokens)
+        bound = min(len1, len2) / max(len1, len2) if len1 and len2 else 0.0
+        if self.config.embedding_model or self.critic_agent:
+            critic_weight = self.config.critic_weight
+            bound = bound * (1 - critic_weight) + critic_weight
+        return bound * min(response1.confidence, response2.confidence)
+
+    def _check_response_signals(
+        self, responses: List[ResponseEntry]
+    ) -> Tuple[float, float, float]:
+        """Confidence, temporal stability and quality signals, in one pass."""
+        count = len(responses)
+        if not count:
+            return 0.0, 0.0, 0.0
+
+        min_confidence = self.config.min_confidence
+        sum_confidence = sum_squares = 0.0
+        above_threshold = high_confidence = 0
+        first_ts = last_ts = responses[0].timestamp
+        for r in responses:
+            confidence = r.confidence
+            sum_confidence += confidence
+            sum_squares += confidence * confidence
+            above_threshold += confidence >= min_confidence
+            high_confidence += confidence >= 0.8
+            timestamp = r.timestamp
+            if timestamp < first_ts:
+                first_ts = timestamp
+            elif timestamp > last_ts:
+                last_ts = timestamp
+
+        # Quality: ratio above the minimum, with a bonus for high confidence
+        quality_ratio = above_threshold / count
+        bonus = min(0.2, high_confidence / count * 0.2)
+        quality = min(1.0, quality_ratio + bonus)
+
+        if count < 2:
+            return 0.0, 0.0, quality
+
+        # Confidence stability (low variance = high stability), provided the
+        # mean confidence clears the minimum
+        mean_confidence = sum_confidence / count
+        if mean_confidence < min_confidence:
+            confidence_signal = 0.0
+        else:
+            variance = max(0.0, sum_squares / count - mean_confidence**2)
+            # Scale variance to 0-1 range
+            confidence_signal = max(0.0, 1.0 - variance * 10)
 
-        # Check if responses are within stability window
-        time_span = (
-            sorted_responses[-1].timestamp - sorted_responses[0].timestamp
-        ).total_seconds()
+        # Temporal stability: responses within the stability window suggest a
+        # stable answer, decaying as they spread out beyond it
+        time_span = last_ts - first_ts
         stability_window = self.config.stability_window_seconds
-
         if time_span <= stability_window:
-            # Recent responses within window suggest stability
-            return 1.0
-
-        # Calculate time-based decay
-        decay_factor = max(
-            0.0, 1.0 - (time_span - stability_window) / (stability_window * 2)
-        )
-        return decay_factor
-
-    def _check_quality_threshold(self, responses: List[ResponseEntry]) -> float:
-        """Check if responses meet quality thresholds."""
-        if not responses:
-            return 0.0
-
-        # Check minimum confidence threshold
-        above_threshold = sum(
-            1 for r in responses if r.confidence >= self.config.min_confidence
-        )
-        quality_ratio = above_threshold / len(responses)
-
-        # Apply quality bonus for high-confidence responses
-        high_confidence = sum(1 for r in responses if r.confidence >= 0.8)
-        bonus = min(0.2, high_confidence / len(responses) * 0.2)
+            stability = 1.0
+        else:
+            stability = max(
+                0.0, 1.0 - (time_span - stability_window) / (stability_window * 2)
+            )
 
-        return min(1.0, quality_ratio + bonus)
+        return confidence_signal, stability, quality
 
     def _make_convergence_decision(self, signals: Dict[str, float]) -> bool:
         """Make final convergence decision based on all signals."""
         # Weighted combination of signals
-        weights = {
-            "similarity": 0.4,  # Most important
-            "confidence": 0.25,
-            "stability": 0.2,
-            "quality": 0.15,
-        }
-
-        weighted_score = sum(
-            signals.get(signal, 0.0) * weight for signal, weight in weights.items()
+        weighted_score = math.sumprod(
+            (signals.get(name, 0.0) for name in _SIGNAL_NAMES), _SIGNAL_WEIGHTS
         )
 
-        # Convergence threshold
-        convergence_threshold = 0.6
-
         # Additional check: require minimum similarity
         min_similarity_met = (
             signals.get("similarity", 0.0) >= self.config.convergence_ratio
         )
 
-        return weighted_score >= convergence_threshold and min_similarity_met
+        return weighted_score >= _CONVERGENCE_THRESHOLD and min_similarity_met
 
     async def _calculate_similarity(
         self, response1: ResponseEntry, response2: ResponseEntry
     ) -> float:
         """Calculate similarity between two responses using hybrid approach."""
-        # Create cache key
-        key = (id(response1), id(response2))
-        reverse_key = (id(response2), id(response1))
+        # Similarity is symmetric, so one ordered key covers both directions
+        id1, id2 = response1.seq_id, response2.seq_id
+        key = (id1, id2) if id1 < id2 else (id2, id1)
 
         # Check cache
-        if key in self.similarity_cache:
-            return self.similarity_cache[key]
-        if reverse_key in self.similarity_cache:
-            return self.similarity_cache[reverse_key]
+        cached = self.similarity_cache.pop(key, None)
+        if cached is not None:
+            # Re-inserting keeps the cache ordered least to most recently used
+            self.similarity_cache[key] = cached
+            return cached
 
         # Calculate Jaccard similarity (fast baseline)
-        jaccard_sim = self._jaccard_similarity(response1.content, response2.content)
+        jaccard_sim = _token_jaccard(response1.tokens, response2.tokens)
 
-        # Calculate AI critic similarity (if available)
-        critic_sim = await self._critic_similarity(response1.content, response2.content)
+        # Calculate semantic similarity (embeddings or AI critic, if available)
+        if self.config.embedding_model:
+            critic_sim = self._embedding_similarity(response1, response2)
+        else:
+            critic_sim = await self._critic_similarity(
+                response1.critic_text, response2.critic_text
+            )
 
         # Combine similarities based on configuration
         if critic_sim is not None:
@@ -497,13 +636,56 @@ Be precise and consider both surface-level and deep semantic similarities.""",
         confidence_weight = min(response1.confidence, response2.confidence)
         weighted_similarity = combined_similarity * confidence_weight
 
-        # Cache result
+        # Cache result, evicting the least recently used pair when full
         self.similarity_cache[key] = weighted_similarity
+        if len(self.similarity_cache) > (
+            self.config.window_size**2 * _CACHED_PAIR_WINDOWS
+        ):
+            del self.similarity_cache[next(iter(self.similarity_cache))]
 
         return weighted_similarity
 
+    def _embedding_similarity(
+        self, response1: ResponseEntry, response2: ResponseEntry
+    ) -> Optional[float]:
+        """
+        Calculate semantic similarity as cosine of the responses' embeddings.
+
+        Only reads embeddings fetched by the batch request in
+        _check_similarity_convergence, so a failed batch falls back to Jaccard
+        rather than issuing one request per pair.
+        """
+        if response1.embedding is None or response2.embedding is None:
+            return None
+        cosine = math.sumprod(response1.embedding, response2.embedding) / (
+            response1.embedding_norm * response2.embedding_norm
+        )
+        return max(0.0, min(1.0, cosine))
+
+    async def _embed_responses(self, responses: Dict[int, ResponseEntry]) -> None:
+        """Embed, in one request, any of the given responses not yet embedded."""
+        missing = [r for r in responses.values() if r.embedding is None]
+        if not missing:
+            return
+
+        try:
+            if self._embedding_client is None:
+                self._embedding_client = get_openai_client(async_client=True)
+            result = await self._embedding_client.embeddings.create(
+                model=self.config.embedding_model,
+                input=[r.critic_text for r in missing],
+            )
+        except Exception as e:
+            logger.warning(f"Embedding similarity calculation failed: {e}")
+            return
+
+        for entry, item in zip(missing, result.data):
+            quantized = _quantize_embedding(item.embedding)
+            if quantized is not None:
+                entry.embedding, entry.embedding_norm = quantized
+
     async def _critic_similarity(self, text1: str, text2: str) -> Optional[float]:
-        """Calculate semantic similarity using AI critic model."""
+        """Calculate semantic similarity of two truncated texts using AI critic model."""
         if not self.critic_agent or not text1 or not text2:
             return None
 
@@ -511,10 +693,10 @@ Be precise and consider both surface-level and deep semantic similarities.""",
             prompt = f"""Analyze the semantic similarity between these two agent responses:
 
 Response 1:
-{text1[:1000]}  # Limit to prevent token overflow
+{text1}
 
 Response 2:
-{text2[:1000]}  # Limit to prevent token overflow
+{text2}
 
 Evaluate their similarity, confidence in your assessment, stability indicators, and overall quality."""
 
@@ -537,23 +719,15 @@ Evaluate their similarity, confidence in your assessment, stability indicators,
             return 0.0
 
         # Normalize and tokenize
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-
-        if not words1 or not words2:
-            return 0.0
-
-        # Jaccard similarity: intersection / union
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-
-        return len(intersection) / len(union) if union else 0.0
+        return _token_jaccard(
+            frozenset(text1.lower().split()), frozenset(text2.lower().split())
+        )
 
-    def _cleanup_old_responses(self) -> None:
+    def _cleanup_old_responses(self, now: Optional[float] = None) -> None:
         """Remove responses that are too old to be relevant."""
-        cutoff_time = datetime.now() - timedelta(
-            minutes=self.config.max_age_minutes * 2
-        )
+        if now is None:
+            now = time.time()
+        cutoff_time = now - self.config.max_age_minutes * 2 * 60
         original_count = len(self.responses)
 
         self.responses = [r for r in self.responses if r.timestamp >= cutoff_time]
@@ -562,16 +736,22 @@ Evaluate their similarity, confidence in your assessment, stability indicators,
         if cleaned_count > 0:
             logger.debug(f"Cleaned up {cleaned_count} old responses")
 
-        # Clear similarity cache if we removed responses
+        # Drop only the cached pairs that involve a removed response; scores
+        # between surviving responses (critic calls included) stay warm
         if cleaned_count > 0:
-            self.similarity_cache.clear()
+            live = {r.seq_id for r in self.responses}
+            self.similarity_cache = {
+                key: similarity
+                for key, similarity in self.similarity_cache.items()
+                if key[0] in live and key[1] in live
+            }
 
-    def _should_skip_check(self) -> bool:
+    def _should_skip_check(self, now: Optional[float] = None) -> bool:
         """Determine if convergence check should be skipped (rate limiting)."""
         if not self.last_convergence_check:
             return False
 
-        time_since_check = (
-            datetime.now() - self.last_convergence_check
-        ).total_seconds()
+        if now is None:
+            now = time.time()
+        time_since_check = now - self.last_convergence_check
         return time_since_check < self.config.stability_window_seconds
@@ -55,6 +55,9 @@ from .utils.tools import execute_python_code
 
 load_dotenv(".env.local")
 
+# Library modules only create named loggers; the app configures handlers once
+logging.basicConfig(level=logging.INFO)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -71,7 +74,7 @@ async def lifespan(app: FastAPI):
                 from pydantic_ai.mcp import MCPServerStreamableHTTP
 
                 # Create and register MCP server in registry
-                mcp_server = MCPServerStreamableHTTP(mcp_server_url)
+                mcp_server = MCPServerStreamableHTTP(url=mcp_server_url)
                 registry = get_mcp_registry()
                 await registry.register(mcp_server, mcp_server_url)
 
@@ -940,6 +943,7 @@ async def chat_with_pydantic_ai(
                 "Connection": "keep-alive",
                 "Transfer-Encoding": "chunked",
                 "Content-Encoding": "none",
+                "X-Accel-Buffering": "no",
                 "X-Chat-Type": "pydantic-ai",  # Header to identify the chat type
                 "X-MCP-Enabled": str(mcp_status.available).lower(),
                 "X-MCP-Status": mcp_status.status.value,
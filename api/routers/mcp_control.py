@@ -67,7 +67,7 @@ async def register_mcp_server(request: MCPServerRegisterRequest):
         logger.info(f"🔌 Attempting to register MCP server: {request.url}")
 
         # Create MCP server instance
-        mcp_server = MCPServerStreamableHTTP(request.url)
+        mcp_server = MCPServerStreamableHTTP(url=request.url)
 
         # Validate connection if requested (default is True)
         if request.validate_connection:
@@ -83,7 +83,6 @@ async def register_mcp_server(request: MCPServerRegisterRequest):
             try:
                 # Force the factory to use our test server
                 factory.mcp_available = True
-                factory._mcp_connection_tested = False  # Reset connection test flag
 
                 # Test the connection
                 test_result = await factory.test_mcp_connection()
@@ -117,7 +116,6 @@ async def register_mcp_server(request: MCPServerRegisterRequest):
                 # Restore original server and state
                 factory.mcp_server = original_server
                 factory.mcp_available = original_server is not None
-                factory._mcp_connection_tested = False  # Reset for next use
 
         # Register the server in the global registry
         registry = get_mcp_registry()
@@ -319,6 +319,7 @@ async def execute_triage_streaming(request: TriageRequest):
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
             },
         )
 
@@ -28,6 +28,14 @@ logger = logging.getLogger(__name__)
 # Get factory instance for streaming
 factory = get_universal_factory()
 
+# Response headers shared by every streamed agent response; Starlette copies
+# them into the response, so one dict serves all requests
+_STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
 
 class UniversalRequest(BaseModel):
     """Single request model for all agent operations"""
@@ -295,10 +303,7 @@ async def execute_agents_streaming(
     return StreamingResponse(
         stream_agent_results(),
         media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        },
+        headers=_STREAM_HEADERS,
     )
 
 
@@ -359,10 +364,7 @@ async def execute_single_agent(
             return StreamingResponse(
                 stream_single_agent(),
                 media_type="text/plain",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                },
+                headers=_STREAM_HEADERS,
             )
         else:
             # Non-streaming execution
@@ -33,6 +33,5 @@ def get_openai_client(
         raise ValueError("No OpenAI API key found in environment variables")
 
     logging.info("Using standard OpenAI endpoint")
-    print(f"Using standard OpenAI endpoint: {openai_key}")
     client_class = AsyncOpenAI if async_client else OpenAI
     return client_class(api_key=openai_key)
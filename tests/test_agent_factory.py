@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Tests for UniversalAgentFactory agent construction
+==================================================
+
+Covers reuse of built agents and their invalidation when the bound MCP
+server changes, the cached MCP availability probe and MCP call coalescing.
+"""
+
+import asyncio
+import contextlib
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.mcp import MCPServerStreamableHTTP
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.toolsets import FunctionToolset
+
+from api.agents.universal import (
+    AgentType,
+    CoalescingToolset,
+    UniversalAgentFactory,
+    UniversalResult,
+    _tool_args_key,
+)
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    return UniversalAgentFactory()
+
+
+class TestAgentCache:
+    """Test per-type agent caching"""
+
+    def test_agent_reused_per_type_and_mode(self, factory):
+        agent = factory.create_agent_with_context(AgentType.SIMPLIFIER)
+
+        assert factory.create_agent_with_context(AgentType.SIMPLIFIER) is agent
+        assert (
+            factory.create_agent_with_context(AgentType.SIMPLIFIER, for_streaming=True)
+            is not agent
+        )
+        assert factory.create_agent_with_context(AgentType.TESTER) is not agent
+
+    def test_mcp_server_change_rebuilds_agents(self, factory):
+        agent = factory.create_agent_with_context(AgentType.SIMPLIFIER)
+
+        factory.mcp_server = factory.mcp_server
+        assert factory.create_agent_with_context(AgentType.SIMPLIFIER) is agent
+
+        factory.mcp_server = MCPServerStreamableHTTP(url="http://localhost:8009/mcp")
+        assert factory.create_agent_with_context(AgentType.SIMPLIFIER) is not agent
+
+    def test_fallback_agent_has_no_mcp_and_is_reused(self, factory):
+        factory.mcp_server = MCPServerStreamableHTTP(url="http://localhost:8009/mcp")
+        agent = factory.create_agent_with_context(AgentType.SIMPLIFIER)
+
+        fallback = factory._fallback_agent(agent, AgentType.SIMPLIFIER, False)
+
+        assert fallback is not agent
+        assert not any(isinstance(t, CoalescingToolset) for t in fallback.toolsets)
+        assert factory._fallback_agent(agent, AgentType.SIMPLIFIER, False) is fallback
+
+        factory.mcp_server = MCPServerStreamableHTTP(url="http://localhost:8010/mcp")
+        assert factory._fallback_agent(agent, AgentType.SIMPLIFIER, False) is fallback
+
+        factory.mcp_server = None
+        assert factory.create_agent_with_context(AgentType.SIMPLIFIER) is fallback
+
+    def test_prompt_only_types_skip_mcp(self, factory):
+        factory.mcp_server = MCPServerStreamableHTTP(url="http://localhost:8009/mcp")
+
+        summarizer = factory.create_agent_with_context(AgentType.SUMMARIZER)
+        simplifier = factory.create_agent_with_context(AgentType.SIMPLIFIER)
+
+        assert not any(isinstance(t, CoalescingToolset) for t in summarizer.toolsets)
+        assert any(isinstance(t, CoalescingToolset) for t in simplifier.toolsets)
+
+    def test_response_cache_key_depends_on_type_repo_and_query(self, factory):
+        def key(agent_type=AgentType.TESTER, repo="repo", query="query"):
+            return factory._response_cache_key(agent_type, repo, [], query)
+
+        assert key() == key()
+        assert key(agent_type=AgentType.SIMPLIFIER) != key()
+        assert key(repo="other") != key()
+        assert key(query="other") != key()
+
+
+class TestMcpProbe:
+    """Test the TTL-cached MCP ping"""
+
+    @pytest.mark.asyncio
+    async def test_probe_result_cached_until_server_changes(self, factory):
+        factory.mcp_server = MCPServerStreamableHTTP(url="http://localhost:8009/mcp")
+        factory._mcp_probe_cache = (time.monotonic() + 30.0, True)
+
+        assert await factory._probe_mcp() is True
+
+        factory.mcp_server = MCPServerStreamableHTTP(url="http://localhost:8010/mcp")
+        assert factory._mcp_probe_cache == (0.0, False)
+
+    @pytest.mark.asyncio
+    async def test_probe_round_trips_through_list_tools(self, factory, monkeypatch):
+        server = MCPServerStreamableHTTP(url="http://localhost:8009/mcp")
+        list_tools = AsyncMock(side_effect=[[], OSError("connection refused")])
+        monkeypatch.setattr(server, "list_tools", list_tools)
+        factory.mcp_server = server
+
+        assert await factory._probe_mcp() is True
+        factory._mcp_probe_cache = (0.0, False)
+        assert await factory._probe_mcp() is False
+        assert list_tools.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_probe_without_server_is_unavailable(self, factory):
+        factory.mcp_server = None
+
+        assert await factory._probe_mcp() is False
+
+
+class TestGlobalFactory:
+    """Test the lazily built module-level factory"""
+
+    def test_concurrent_first_calls_share_one_factory(self, monkeypatch):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from api.agents import universal
+
+        monkeypatch.setattr(universal, "_factory_instance", None)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            factories = list(
+                pool.map(lambda _: universal.get_universal_factory(), range(16))
+            )
+
+        assert all(f is factories[0] for f in factories)
+
+
+class TestParallelExecution:
+    """Test batched agent execution"""
+
+    @pytest.mark.asyncio
+    async def test_results_in_spec_order_with_failures_mapped(
+        self, factory, monkeypatch
+    ):
+        async def fake_execute_agent(agent_type, repository_name, user_query, context):
+            if agent_type is AgentType.TESTER:
+                raise RuntimeError("boom")
+            return UniversalResult(agent_type=agent_type, content=user_query)
+
+        monkeypatch.setattr(factory, "execute_agent", fake_execute_agent)
+
+        results = await factory.execute_agents_parallel(
+            [
+                (AgentType.SIMPLIFIER, "repo", "first", None),
+                (AgentType.TESTER, "repo", "second", None),
+                (AgentType.SUMMARIZER, "repo", "third", None),
+            ],
+            max_concurrency=2,
+        )
+
+        assert [r.agent_type for r in results] == [
+            AgentType.SIMPLIFIER,
+            AgentType.TESTER,
+            AgentType.SUMMARIZER,
+        ]
+        assert results[0].content == "first"
+        assert results[1].confidence == 0.0
+        assert results[1].metadata["error"] == "boom"
+
+    @pytest.mark.asyncio
+    async def test_batch_shares_one_mcp_session(self, factory, monkeypatch):
+        events = []
+
+        class FakeServer:
+            async def __aenter__(self):
+                events.append("open")
+                return self
+
+            async def __aexit__(self, *exc):
+                events.append("close")
+
+        async def fake_execute_agent(agent_type, repository_name, user_query, context):
+            events.append(user_query)
+            return UniversalResult(agent_type=agent_type, content=user_query)
+
+        factory._mcp_server = FakeServer()
+        monkeypatch.setattr(factory, "refresh_mcp", lambda: None)
+        monkeypatch.setattr(factory, "execute_agent", fake_execute_agent)
+
+        await factory.execute_agents_parallel(
+            [
+                (AgentType.SIMPLIFIER, "repo", "first", None),
+                (AgentType.TESTER, "repo", "second", None),
+            ]
+        )
+
+        assert events == ["open", "first", "second", "close"]
+
+
+class _SlowToolset:
+    """Stand-in MCP toolset that counts the calls reaching it"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def call_tool(self, name, tool_args, ctx, tool):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"{name}:{tool_args['query']}"
+
+
+def _tool_calling_agent(toolset):
+    """Agent whose model calls search_code once with the run's prompt as query"""
+
+    def respond(messages, info):
+        for message in messages:
+            for part in message.parts:
+                if isinstance(part, ToolReturnPart):
+                    return ModelResponse(parts=[TextPart(str(part.content))])
+        prompt = messages[0].parts[-1].content
+        return ModelResponse(parts=[ToolCallPart("search_code", {"query": prompt})])
+
+    return Agent(FunctionModel(respond), toolsets=[toolset])
+
+
+class _SearchToolset(FunctionToolset):
+    """search_code tool recording its call count and peak concurrency"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = self.active = self.peak = 0
+        self.add_function(self.search_code)
+
+    async def search_code(self, query: str) -> str:
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            return f"search_code:{query}"
+        finally:
+            self.active -= 1
+
+
+class TestCoalescingToolset:
+    """Test sharing of in-flight MCP tool calls"""
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_calls_share_one_rpc(self):
+        wrapped = _SlowToolset()
+        toolset = CoalescingToolset(wrapped)
+
+        results = await asyncio.gather(
+            toolset.call_tool("search_code", {"query": "a"}, None, None),
+            toolset.call_tool("search_code", {"query": "a"}, None, None),
+            toolset.call_tool("search_code", {"query": "b"}, None, None),
+        )
+
+        assert results == ["search_code:a", "search_code:a", "search_code:b"]
+        assert wrapped.calls == 2
+        assert toolset.state.inflight == {}
+
+        await toolset.call_tool("search_code", {"query": "a"}, None, None)
+        assert wrapped.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrent_rpcs_bounded(self):
+        class _TrackingToolset(_SlowToolset):
+            active = peak = 0
+
+            async def call_tool(self, name, tool_args, ctx, tool):
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                try:
+                    return await super().call_tool(name, tool_args, ctx, tool)
+                finally:
+                    self.active -= 1
+
+        wrapped = _TrackingToolset()
+        toolset = CoalescingToolset(wrapped, max_concurrency=2)
+
+        await asyncio.gather(
+            *(
+                toolset.call_tool("search_code", {"query": str(i)}, None, None)
+                for i in range(6)
+            )
+        )
+
+        assert wrapped.calls == 6
+        assert wrapped.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_calls_shared_across_agent_runs(self):
+        wrapped = _SearchToolset()
+        agent = _tool_calling_agent(CoalescingToolset(wrapped))
+
+        results = await asyncio.gather(*(agent.run("a") for _ in range(3)))
+
+        assert [r.output for r in results] == ["search_code:a"] * 3
+        assert wrapped.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded_across_agent_runs(self):
+        wrapped = _SearchToolset()
+        agent = _tool_calling_agent(CoalescingToolset(wrapped, max_concurrency=2))
+
+        await asyncio.gather(*(agent.run(str(i)) for i in range(6)))
+
+        assert wrapped.calls == 6
+        assert wrapped.peak == 2
+
+    def test_args_key_order_independent_and_handles_nested(self):
+        flat = _tool_args_key("search_code", {"query": "a", "repo_name": "r"})
+        assert flat == _tool_args_key("search_code", {"repo_name": "r", "query": "a"})
+
+        nested = _tool_args_key("find_entities", {"filters": {"type": ["function"]}})
+        assert nested == _tool_args_key(
+            "find_entities", {"filters": {"type": ["function"]}}
+        )
+        assert nested != _tool_args_key("find_entities", {"filters": {"type": []}})
+
+
+class TestExecutionTimeout:
+    """Test that a run exceeding its time budget yields an error result"""
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_error_result(self, factory, monkeypatch):
+        class _StalledAgent:
+            def run_mcp_servers(self):
+                return contextlib.nullcontext()
+
+            async def run(self, *args, **kwargs):
+                raise asyncio.TimeoutError
+
+        monkeypatch.setattr(factory, "refresh_mcp", lambda: None)
+        monkeypatch.setattr(
+            factory, "create_agent_with_context", lambda *_: _StalledAgent()
+        )
+
+        result = await factory.execute_agent(AgentType.TESTER, "repo", "query")
+
+        assert result.confidence == 0.0
+        assert result.metadata["timeout"] is True
+
+
+class TestMcpCircuitBreaker:
+    """Test skipping MCP after repeated failures"""
+
+    def test_opens_after_repeated_failures_then_recovers(self, factory):
+        from api.agents.universal import _MCP_MAX_FAILURES
+
+        for _ in range(_MCP_MAX_FAILURES):
+            factory._record_mcp_failure()
+        assert not factory._mcp_circuit_open()
+
+        factory._record_mcp_failure()
+        assert factory._mcp_circuit_open()
+
+        factory._mcp_cooldown_until = time.monotonic() - 1
+        assert not factory._mcp_circuit_open()
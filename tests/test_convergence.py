@@ -7,9 +7,10 @@ Comprehensive test suite for the ConvergenceDetector class,
 including AI critic functionality and fallback mechanisms.
 """
 
+import asyncio
 import pytest
 import pytest_asyncio
-from datetime import datetime, timedelta
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 # Configure pytest-asyncio
@@ -30,19 +31,39 @@ class TestResponseEntry:
         """Test creating a valid ResponseEntry."""
         entry = ResponseEntry(
             content="Test response",
-            timestamp=datetime.now(),
+            timestamp=time.time(),
             confidence=0.8,
             metadata={"source": "test"},
         )
         assert entry.content == "Test response"
         assert 0.0 <= entry.confidence <= 1.0
 
+    def test_tokens_computed_once_on_creation(self):
+        """Test the normalized word set is cached on the entry."""
+        entry = ResponseEntry("Hello hello World", time.time())
+        assert entry.tokens == frozenset({"hello", "world"})
+
+    def test_embedding_quantized_to_int8(self):
+        """Test embeddings are stored as int8 codes scaled to the peak value."""
+        from api.agents.utils.convergence import _quantize_embedding
+
+        codes, norm = _quantize_embedding([0.5, -1.0, 0.0])
+        assert codes.typecode == "b"
+        assert list(codes) == [64, -127, 0]
+        assert norm == pytest.approx((64**2 + 127**2) ** 0.5)
+        assert _quantize_embedding([0.0, 0.0]) is None
+
+    def test_critic_text_truncated_once_on_creation(self):
+        """Test the critic prompt text is sliced when the entry is made."""
+        entry = ResponseEntry("x" * 5000, time.time())
+        assert entry.critic_text == "x" * 1000
+
     def test_empty_content_validation(self):
         """Test that empty content raises ValueError."""
         with pytest.raises(ValueError, match="Response content cannot be empty"):
             ResponseEntry(
                 content="",
-                timestamp=datetime.now(),
+                timestamp=time.time(),
                 confidence=0.8,
             )
 
@@ -51,7 +72,7 @@ class TestResponseEntry:
         with pytest.raises(ValueError, match="Confidence must be between 0.0 and 1.0"):
             ResponseEntry(
                 content="Test response",
-                timestamp=datetime.now(),
+                timestamp=time.time(),
                 confidence=1.5,
             )
 
@@ -127,6 +148,14 @@ class TestConvergenceConfig:
         with pytest.raises(ValueError):
             ConvergenceConfig(critic_weight=1.5)
 
+    def test_config_is_frozen_and_shared_by_default(self):
+        """Test the config is immutable, so detectors can share the default."""
+        config = ConvergenceConfig()
+        with pytest.raises(ValueError):
+            config.window_size = 5
+
+        assert ConvergenceDetector().config is ConvergenceDetector().config
+
 
 class TestConvergenceDetector:
     """Test ConvergenceDetector main functionality."""
@@ -177,6 +206,15 @@ class TestConvergenceDetector:
 
         assert detector.critic_agent is None
 
+    @patch("api.agents.utils.convergence.Agent")
+    def test_critic_agent_built_lazily(self, mock_agent_class):
+        """Test the AI critic agent is only built on first use."""
+        detector = ConvergenceDetector(ConvergenceConfig(use_critic_model=True))
+        mock_agent_class.assert_not_called()
+
+        assert detector.critic_agent is detector.critic_agent
+        mock_agent_class.assert_called_once()
+
     def test_add_response(self):
         """Test adding responses to the detector."""
         detector = ConvergenceDetector()
@@ -305,8 +343,8 @@ class TestConvergenceDetector:
         detector = ConvergenceDetector(config)
         detector.critic_agent = mock_agent
 
-        response1 = ResponseEntry("similar text content", datetime.now(), 0.8)
-        response2 = ResponseEntry("similar text content", datetime.now(), 0.9)
+        response1 = ResponseEntry("similar text content", time.time(), 0.8)
+        response2 = ResponseEntry("similar text content", time.time(), 0.9)
 
         result = await detector._calculate_similarity(response1, response2)
 
@@ -314,14 +352,145 @@ class TestConvergenceDetector:
         # With confidence weighting (min of 0.8, 0.9 = 0.8)
         assert 0.7 <= result <= 1.0  # Reasonable range for similar content
 
+    @pytest.mark.asyncio
+    async def test_critic_calls_for_pairs_run_concurrently(self):
+        """Test every pair's critic call is in flight at the same time."""
+        in_flight = 0
+        peak = 0
+
+        async def slow_run(prompt):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            result = MagicMock()
+            result.output = SimilarityMetrics(
+                similarity=0.9, confidence=0.9, stability=0.9, quality=0.9
+            )
+            return result
+
+        detector = ConvergenceDetector()
+        detector.critic_agent = MagicMock(run=slow_run)
+        responses = [
+            ResponseEntry(f"response number {i}", time.time(), 0.8) for i in range(3)
+        ]
+
+        await detector._check_similarity_convergence(responses)
+
+        assert peak == 3
+        assert len(detector.similarity_cache) == 3
+
+    @pytest.mark.asyncio
+    async def test_pairs_that_cannot_reach_threshold_are_not_scored(self):
+        """Test a pair with very different token counts skips the critic."""
+        detector = ConvergenceDetector(ConvergenceConfig(critic_weight=0.2))
+        detector.critic_agent = AsyncMock()
+        detector.critic_agent.run.return_value = MagicMock(
+            output=SimilarityMetrics(
+                similarity=1.0, confidence=1.0, stability=1.0, quality=1.0
+            )
+        )
+        short = ResponseEntry("short answer", time.time(), 1.0)
+        long = ResponseEntry(" ".join(f"word{i}" for i in range(20)), time.time())
+
+        ratio = await detector._check_similarity_convergence([short, long])
+
+        assert ratio == 0.0
+        detector.critic_agent.run.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_embedding_similarity_replaces_critic(self):
+        """Test configured embeddings are fetched once per check, not per pair."""
+        vectors = {"alpha": [1.0, 0.0], "beta": [3.0, 4.0], "gamma": [0.0, 2.0]}
+        client = MagicMock()
+        client.embeddings.create = AsyncMock(
+            side_effect=lambda model, input: MagicMock(
+                data=[MagicMock(embedding=vectors[text]) for text in input]
+            )
+        )
+        detector = ConvergenceDetector(
+            ConvergenceConfig(embedding_model="text-embedding-3-small")
+        )
+        detector.critic_agent = AsyncMock()
+        detector._embedding_client = client
+        responses = [
+            ResponseEntry(text, time.time(), 1.0) for text in ("alpha", "beta", "gamma")
+        ]
+
+        await detector._check_similarity_convergence(responses)
+
+        client.embeddings.create.assert_awaited_once()
+        detector.critic_agent.run.assert_not_called()
+        # cos(alpha, beta) = 0.6 up to int8 rounding, blended with Jaccard 0
+        # at the default 0.7 weight
+        cached = detector.similarity_cache[(responses[0].seq_id, responses[1].seq_id)]
+        assert cached == pytest.approx(0.6 * 0.7, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_failed_embedding_not_retried_per_pair(self):
+        """Test a failed embedding batch falls back to Jaccard without retries."""
+        client = MagicMock()
+        client.embeddings.create = AsyncMock(side_effect=RuntimeError("rate limited"))
+        detector = ConvergenceDetector(
+            ConvergenceConfig(embedding_model="text-embedding-3-small")
+        )
+        detector._embedding_client = client
+        responses = [
+            ResponseEntry(text, time.time(), 1.0)
+            for text in ("same words", "same words", "same words")
+        ]
+
+        ratio = await detector._check_similarity_convergence(responses)
+
+        client.embeddings.create.assert_awaited_once()
+        assert ratio == 1.0
+
+    @pytest.mark.asyncio
+    async def test_similarity_cached_once_per_unordered_pair(self):
+        """Test a pair is cached under one stable key in either order."""
+        detector = ConvergenceDetector()
+        detector.critic_agent = None
+        response1 = ResponseEntry("hello world", time.time(), 0.8)
+        response2 = ResponseEntry("hello there", time.time(), 0.8)
+
+        first = await detector._calculate_similarity(response1, response2)
+        second = await detector._calculate_similarity(response2, response1)
+
+        assert first == second
+        assert list(detector.similarity_cache) == [(response1.seq_id, response2.seq_id)]
+
+    @pytest.mark.asyncio
+    async def test_similarity_cache_evicts_least_recently_used(self):
+        """Test the pair cache is bounded and keeps recently used pairs."""
+        from api.agents.utils.convergence import _CACHED_PAIR_WINDOWS
+
+        detector = ConvergenceDetector(ConvergenceConfig(window_size=2))
+        detector.critic_agent = None
+        limit = 2**2 * _CACHED_PAIR_WINDOWS
+        entries = []
+        for i in range(limit + 2):
+            detector.add_response(f"response {i}")
+            entries.append(detector.responses[-1])
+        first = entries[0]
+
+        for other in entries[1 : limit + 1]:
+            await detector._calculate_similarity(first, other)
+        await detector._calculate_similarity(first, entries[1])  # mark as used
+        await detector._calculate_similarity(first, entries[limit + 1])
+
+        assert len(detector.similarity_cache) == limit
+        assert (first.seq_id, entries[1].seq_id) in detector.similarity_cache
+        assert (first.seq_id, entries[2].seq_id) not in detector.similarity_cache
+
     @pytest.mark.asyncio
     async def test_fallback_similarity_calculation(self):
         """Test similarity calculation fallback to Jaccard only."""
         detector = ConvergenceDetector()
         detector.critic_agent = None  # No critic available
 
-        response1 = ResponseEntry("identical text", datetime.now(), 0.8)
-        response2 = ResponseEntry("identical text", datetime.now(), 0.9)
+        response1 = ResponseEntry("identical text", time.time(), 0.8)
+        response2 = ResponseEntry("identical text", time.time(), 0.9)
 
         result = await detector._calculate_similarity(response1, response2)
 
@@ -330,6 +499,21 @@ class TestConvergenceDetector:
         expected_weighted = expected_jaccard * 0.8  # Min confidence
         assert result == expected_weighted
 
+    def test_response_signals(self):
+        """Test confidence, stability and quality signals from one pass."""
+        detector = ConvergenceDetector(ConvergenceConfig(stability_window_seconds=10))
+        now = time.time()
+        responses = [
+            ResponseEntry("first", now, 0.8),
+            ResponseEntry("second", now - 20, 0.4),
+        ]
+
+        confidence, stability, quality = detector._check_response_signals(responses)
+
+        assert confidence == pytest.approx(1.0 - 0.04 * 10)  # variance 0.04
+        assert stability == pytest.approx(0.5)  # 10s past the window of 10s
+        assert quality == pytest.approx(1.0)
+
     def test_jaccard_similarity(self):
         """Test Jaccard similarity calculation."""
         detector = ConvergenceDetector()
@@ -389,7 +573,7 @@ class TestConvergenceDetector:
         detector.add_response("Test response")
         detector.convergence_history.append(True)
         detector.similarity_cache[(1, 2)] = 0.5
-        detector.last_convergence_check = datetime.now()
+        detector.last_convergence_check = time.time()
 
         # Reset
         detector.reset()
@@ -405,12 +589,15 @@ class TestConvergenceDetector:
         detector = ConvergenceDetector(config)
 
         # Add old response
-        old_time = datetime.now() - timedelta(minutes=5)
+        old_time = time.time() - 5 * 60
         old_response = ResponseEntry("Old response", old_time, 0.8)
         detector.responses.append(old_response)
 
         # Add recent response
         detector.add_response("Recent response")
+        recent = detector.responses[-1]
+        detector.similarity_cache[(old_response.seq_id, recent.seq_id)] = 0.5
+        detector.similarity_cache[(recent.seq_id, recent.seq_id)] = 1.0
 
         # Trigger cleanup
         detector._cleanup_old_responses()
@@ -418,6 +605,27 @@ class TestConvergenceDetector:
         # Only recent response should remain
         assert len(detector.responses) == 1
         assert detector.responses[0].content == "Recent response"
+        # Only pairs between surviving responses stay cached
+        assert list(detector.similarity_cache) == [(recent.seq_id, recent.seq_id)]
+
+    def test_stored_responses_are_bounded(self):
+        """Test only a few windows of responses are retained."""
+        detector = ConvergenceDetector(ConvergenceConfig(window_size=2))
+        for i in range(20):
+            detector.add_response(f"response {i}")
+
+        assert len(detector.responses) == detector._max_responses
+        assert detector.responses[-1].content == "response 19"
+
+    def test_recent_responses_are_newest_window_first(self):
+        """Test recents are the newest window_size responses, newest first."""
+        detector = ConvergenceDetector(ConvergenceConfig(window_size=2))
+        for content in ("first", "second", "third"):
+            detector.add_response(content)
+
+        recent = detector._get_recent_responses()
+
+        assert [r.content for r in recent] == ["third", "second"]
 
     def test_should_skip_check_rate_limiting(self):
         """Test rate limiting for convergence checks."""
@@ -428,18 +636,18 @@ class TestConvergenceDetector:
         assert detector._should_skip_check() is False
 
         # Recent check within window
-        detector.last_convergence_check = datetime.now()
+        detector.last_convergence_check = time.time()
         assert detector._should_skip_check() is True
 
         # Old check outside window
-        detector.last_convergence_check = datetime.now() - timedelta(seconds=15)
+        detector.last_convergence_check = time.time() - 15
         assert detector._should_skip_check() is False
 
     @pytest.mark.asyncio
     async def test_force_check_bypasses_rate_limiting(self):
         """Test that force_check bypasses rate limiting."""
         detector = ConvergenceDetector()
-        detector.last_convergence_check = datetime.now()  # Recent check
+        detector.last_convergence_check = time.time()  # Recent check
 
         # Add sufficient responses
         detector.add_response("First response")
@@ -452,6 +660,29 @@ class TestConvergenceDetector:
         result = await detector.has_converged(force_check=True)
         assert isinstance(result, bool)  # Should return a result, not skip
 
+    @pytest.mark.asyncio
+    async def test_unchanged_responses_reuse_last_result(self):
+        """Test a check without new responses returns the previous outcome."""
+        config = ConvergenceConfig(stability_window_seconds=5)
+        detector = ConvergenceDetector(config)
+        detector.critic_agent = None
+        detector.add_response("same answer")
+        detector.add_response("same answer")
+
+        first = await detector.has_converged(force_check=True)
+        detector.last_convergence_check = None  # rate limit out of the way
+
+        with patch.object(
+            detector, "_calculate_convergence_signals", new_callable=AsyncMock
+        ) as signals:
+            assert await detector.has_converged() is first
+            signals.assert_not_called()
+
+            detector.add_response("new answer")
+            signals.return_value = {"similarity": 0.0}
+            await detector.has_converged()
+            signals.assert_called_once()
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
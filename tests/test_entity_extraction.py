@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Tests for conversation context entity extraction
+================================================
+
+Covers how MCP tool calls/results in new_messages are matched and parsed
+into the per-repository ConversationContext.
+"""
+
+from pathlib import Path
+
+import pytest
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from api.agents import universal
+from api.agents.universal import (
+    _MAX_HISTORY_MESSAGES,
+    ConversationContext,
+    UniversalAgentFactory,
+)
+
+ENTITY_ID = "123e4567-e89b-12d3-a456-426614174000"
+
+
+@pytest.fixture
+def factory():
+    return UniversalAgentFactory()
+
+
+def _tool_exchange(tool_name, args, content, call_id="call_1"):
+    """Build the response/request pair pydantic-ai records for one tool call"""
+    return [
+        ModelResponse(
+            parts=[ToolCallPart(tool_name=tool_name, args=args, tool_call_id=call_id)]
+        ),
+        ModelRequest(
+            parts=[
+                ToolReturnPart(
+                    tool_name=tool_name, content=content, tool_call_id=call_id
+                )
+            ]
+        ),
+    ]
+
+
+class TestExtractEntitiesFromMessages:
+    """Test single-pass tool call/result matching"""
+
+    @pytest.mark.asyncio
+    async def test_tool_result_matched_to_call(self, factory):
+        context = ConversationContext()
+        messages = _tool_exchange(
+            "find_entities", {"repo_name": "repo"}, f"ID: {ENTITY_ID}"
+        )
+
+        await factory._extract_entities_from_messages(context, messages)
+
+        assert ENTITY_ID in context.valid_entity_ids
+        assert ENTITY_ID in context.discovered_entities
+
+    @pytest.mark.asyncio
+    async def test_json_string_args_are_parsed(self, factory):
+        context = ConversationContext()
+        messages = _tool_exchange(
+            "search_code", '{"repo_name": "repo", "query": "auth"}', "def login()"
+        )
+
+        await factory._extract_entities_from_messages(context, messages)
+
+        assert "auth" in context.repository_info["repo"]["search_results"]
+
+    @pytest.mark.asyncio
+    async def test_repository_info_writers_applied_in_message_order(
+        self, factory, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(universal, "TOOL_RESULT_PERSIST_THRESHOLD", 100)
+        monkeypatch.setattr(universal, "_TOOL_RESULT_DIR", tmp_path)
+        context = ConversationContext()
+        messages = [
+            *_tool_exchange(
+                "qa_codebase", {"repo_name": "repo", "question": "q"}, "x" * 5000
+            ),
+            *_tool_exchange(
+                "repo_get_info", {"repo_name": "repo"}, "indexed", call_id="call_2"
+            ),
+            *_tool_exchange(
+                "search_code",
+                {"repo_name": "repo", "query": "auth"},
+                "y" * 5000,
+                call_id="call_3",
+            ),
+        ]
+
+        await factory._extract_entities_from_messages(context, messages)
+
+        repo_info = context.repository_info["repo"]
+        assert repo_info["status"] == "indexed"
+        assert "auth" in repo_info["search_results"]
+        assert "qa_results" not in repo_info
+
+    @pytest.mark.asyncio
+    async def test_unmatched_result_and_unknown_tool_ignored(self, factory):
+        context = ConversationContext()
+        messages = _tool_exchange("unknown_tool", {}, f"ID: {ENTITY_ID}")
+        messages.append(
+            ModelRequest(
+                parts=[
+                    ToolReturnPart(
+                        tool_name="find_entities",
+                        content=f"ID: {ENTITY_ID}",
+                        tool_call_id="orphan",
+                    )
+                ]
+            )
+        )
+
+        await factory._extract_entities_from_messages(context, messages)
+
+        assert context.valid_entity_ids == []
+        assert context.repository_info == {}
+
+
+class TestToolResultStorage:
+    """Test bounded storage of tool results in the conversation context"""
+
+    @pytest.mark.asyncio
+    async def test_search_results_evict_oldest(self, factory):
+        from api.agents.universal import _MAX_CACHED_RESULTS
+
+        context = ConversationContext()
+        for i in range(_MAX_CACHED_RESULTS + 5):
+            await factory._process_tool_result(
+                context,
+                "search_code",
+                {"repo_name": "repo", "query": f"query {i}"},
+                "x" * 5000,
+            )
+
+        search_results = context.repository_info["repo"]["search_results"]
+        assert len(search_results) == _MAX_CACHED_RESULTS
+        assert "query 0" not in search_results
+        assert f"query {_MAX_CACHED_RESULTS + 4}" in search_results
+        assert len(search_results["query 10"]["result"]) == 1000
+
+    @pytest.mark.asyncio
+    async def test_structured_find_entities_payload(self, factory):
+        import json
+
+        context = ConversationContext()
+        payload = json.dumps(
+            {
+                "entities": [
+                    {
+                        "entity_id": ENTITY_ID,
+                        "name": "login",
+                        "type": "function",
+                        "file": "auth.py",
+                    }
+                ]
+            }
+        )
+
+        await factory._process_tool_result(
+            context, "find_entities", {"repo_name": "repo"}, payload
+        )
+
+        assert context.valid_entity_ids == [ENTITY_ID]
+        entity = context.discovered_entities[ENTITY_ID]
+        assert entity["name"] == "login"
+        assert entity["type"] == "function"
+        assert entity["file"] == "auth.py"
+
+    @pytest.mark.asyncio
+    async def test_relationships_share_entity_row(self, factory):
+        context = ConversationContext()
+        other_id = "123e4567-e89b-12d3-a456-426614174001"
+
+        await factory._process_tool_result(
+            context, "find_entities", {"repo_name": "repo"}, f"ID: {ENTITY_ID}"
+        )
+        await factory._process_tool_result(
+            context,
+            "get_entity_relationships",
+            {"entity_id": ENTITY_ID},
+            f"calls {other_id}",
+        )
+
+        row = context.entities[ENTITY_ID]
+        assert row.info["id"] == ENTITY_ID
+        assert len(row.relationships) == 1
+        assert context.valid_entity_ids == [ENTITY_ID, other_id]
+        assert context.entity_relationships == {ENTITY_ID: row.relationships}
+
+    @pytest.mark.asyncio
+    async def test_qa_mentions_require_uuid_shape(self, factory):
+        context = ConversationContext()
+        content = f"{'-' * 36}\nSee {ENTITY_ID} and {'a' * 36}"
+
+        await factory._process_tool_result(
+            context, "qa_codebase", {"repo_name": "repo"}, content
+        )
+
+        assert context.valid_entity_ids == [ENTITY_ID]
+
+    @pytest.mark.asyncio
+    async def test_entities_system_message_cached_until_discovery(self, factory):
+        context = ConversationContext()
+        assert factory._build_entities_system_message(context, "repo") is None
+
+        await factory._process_tool_result(
+            context, "find_entities", {"repo_name": "repo"}, f"ID: {ENTITY_ID}"
+        )
+        first = factory._build_entities_system_message(context, "repo")
+        assert ENTITY_ID in first.parts[0].content
+        assert factory._build_entities_system_message(context, "repo") is first
+
+        await factory._process_tool_result(
+            context,
+            "qa_codebase",
+            {"repo_name": "repo"},
+            "see 123e4567-e89b-12d3-a456-426614174001",
+        )
+        assert factory._build_entities_system_message(context, "repo") is not first
+
+    @pytest.mark.asyncio
+    async def test_structured_tool_content_is_parsed(self, factory):
+        context = ConversationContext()
+        content = {"entities": [{"id": ENTITY_ID, "name": "login"}]}
+
+        await factory._process_tool_result(
+            context, "find_entities", {"repo_name": "repo"}, content
+        )
+
+        assert context.discovered_entities[ENTITY_ID]["name"] == "login"
+
+    @pytest.mark.asyncio
+    async def test_large_qa_result_persisted_to_disk(
+        self, factory, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(universal, "TOOL_RESULT_PERSIST_THRESHOLD", 100)
+        monkeypatch.setattr(universal, "_TOOL_RESULT_DIR", tmp_path)
+        context = ConversationContext()
+        content = "x" * 5000
+
+        await factory._process_tool_result(
+            context, "qa_codebase", {"repo_name": "repo", "question": "q"}, content
+        )
+
+        entry = context.repository_info["repo"]["qa_results"]["q"]
+        assert len(entry["result"]) == universal._MAX_STORED_RESULT_CHARS
+        assert Path(entry["result_path"]).read_text() == content
+
+    @pytest.mark.asyncio
+    async def test_persisted_results_evicted_past_file_cap(
+        self, factory, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(universal, "TOOL_RESULT_PERSIST_THRESHOLD", 100)
+        monkeypatch.setattr(universal, "_TOOL_RESULT_DIR", tmp_path)
+        monkeypatch.setattr(universal, "_MAX_TOOL_RESULT_FILES", 2)
+        context = ConversationContext()
+
+        for i in range(4):
+            await factory._process_tool_result(
+                context,
+                "qa_codebase",
+                {"repo_name": "repo", "question": f"q{i}"},
+                str(i) * 5000,
+            )
+
+        qa_results = context.repository_info["repo"]["qa_results"]
+        assert len(list(tmp_path.glob("*.txt"))) == 2
+        assert Path(qa_results["q3"]["result_path"]).exists()
+
+
+class TestMessageHistory:
+    """Test the bounded conversation history"""
+
+    def test_trims_oldest_turns_on_user_prompt_boundary(self):
+        context = ConversationContext()
+        turn = [
+            ModelRequest(parts=[UserPromptPart(content="question")]),
+            *_tool_exchange("search_code", {"query": "q"}, "result"),
+        ]
+
+        for _ in range(_MAX_HISTORY_MESSAGES // len(turn) + 2):
+            context.append_messages(turn)
+
+        history = context.message_history
+        assert len(history) <= _MAX_HISTORY_MESSAGES
+        assert isinstance(history[0].parts[0], UserPromptPart)
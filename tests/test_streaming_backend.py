@@ -109,9 +109,7 @@ class TestEnhancedStreaming:
         with patch.object(
             factory, "create_agent_with_context", return_value=mock_agent
         ):
-            with patch.object(
-                factory, "_ensure_mcp_connection_tested", new_callable=AsyncMock
-            ):
+            with patch.object(factory, "_test_mcp_connection", new_callable=AsyncMock):
 
                 # Execute streaming
                 events = []
@@ -159,9 +157,7 @@ class TestEnhancedStreaming:
         with patch.object(
             factory, "create_agent_with_context", return_value=mock_agent
         ):
-            with patch.object(
-                factory, "_ensure_mcp_connection_tested", new_callable=AsyncMock
-            ):
+            with patch.object(factory, "_test_mcp_connection", new_callable=AsyncMock):
 
                 # Patch the streaming method directly to test budget exceeded logic
                 original_method = factory.execute_agent_streaming
@@ -230,9 +226,7 @@ class TestEnhancedStreaming:
         with patch.object(
             factory, "create_agent_with_context", return_value=mock_agent
         ):
-            with patch.object(
-                factory, "_ensure_mcp_connection_tested", new_callable=AsyncMock
-            ):
+            with patch.object(factory, "_test_mcp_connection", new_callable=AsyncMock):
 
                 # Patch the streaming method directly to test convergence logic
                 original_method = factory.execute_agent_streaming
@@ -307,9 +301,7 @@ class TestEnhancedStreaming:
         with patch.object(
             factory, "create_agent_with_context", return_value=mock_agent
         ):
-            with patch.object(
-                factory, "_ensure_mcp_connection_tested", new_callable=AsyncMock
-            ):
+            with patch.object(factory, "_test_mcp_connection", new_callable=AsyncMock):
 
                 # Mock successful fallback execution
                 mock_result = MagicMock()
@@ -388,6 +380,105 @@ class TestEnhancedStreaming:
             # Verify timestamp is valid ISO format
             datetime.fromisoformat(event_data["timestamp"])
 
+    def test_format_text_event_v5_framing(self, factory):
+        """Test text deltas are framed exactly like build_text_stream output."""
+
+        for delta in ["Hello world", 'quote " newline \n unicode é', ""]:
+            event_str = factory._format_stream_event("text", {"delta": delta})
+
+            expected = {"type": "text", "text": delta}
+            assert event_str == f"0:{json.dumps(expected, ensure_ascii=False)}\n"
+
+    @pytest.mark.asyncio
+    async def test_idle_stream_emits_heartbeat(self):
+        """Test an idle stream is padded with heartbeats and errors still surface."""
+        from api.agents.universal import _with_heartbeat
+
+        async def slow_stream():
+            yield "first"
+            await asyncio.sleep(0.05)
+            yield "second"
+            raise ValueError("stream failed")
+
+        events = []
+        with pytest.raises(ValueError, match="stream failed"):
+            async for event in _with_heartbeat(slow_stream(), 0.01, "ping"):
+                events.append(event)
+
+        assert events[0] == "first"
+        assert events[-1] == "second"
+        assert "ping" in events
+
+    @pytest.mark.asyncio
+    async def test_early_close_releases_run_before_mcp_session(
+        self, factory, mock_agent
+    ):
+        """Test closing the stream early unwinds the run, then the MCP session."""
+        closed = []
+        factory._mcp_server = MagicMock()
+        mock_agent.run_mcp_servers.return_value.__aexit__.side_effect = (
+            lambda *exc: closed.append("mcp")
+        )
+
+        async def fake_stream_run(*args, **kwargs):
+            try:
+                yield "first"
+                yield "second"
+            finally:
+                closed.append("run")
+
+        with (
+            patch.object(factory, "create_agent_with_context", return_value=mock_agent),
+            patch.object(factory, "_stream_run", fake_stream_run),
+            patch.object(factory, "refresh_mcp"),
+        ):
+            events = factory._stream_agent_events(
+                AgentType.SIMPLIFIER, "test-repo", "Analyze this code"
+            )
+            assert await events.__anext__() == "first"
+            await events.aclose()
+
+        assert closed == ["run", "mcp"]
+
+    @pytest.mark.asyncio
+    async def test_repeated_tokens_do_not_converge(self, factory):
+        """Test the budget tracker sees whole lines, not repeated single tokens."""
+        from pydantic_ai import Agent
+        from pydantic_ai.models.function import FunctionModel
+
+        tokens = ["| a | b |\n", "|", "---", "|", "---", "|", "---", "|\n", "| 1 | 2 |"]
+
+        async def stream_tokens(messages, info):
+            for token in tokens:
+                yield token
+
+        dependencies = UniversalDependencies(
+            repository_name="test-repo",
+            agent_type=AgentType.SIMPLIFIER,
+            user_query="Tabulate",
+            conversation_context=ConversationContext(),
+        )
+
+        events = [
+            event
+            async for event in factory._stream_run(
+                Agent(FunctionModel(stream_function=stream_tokens)),
+                "Tabulate",
+                dependencies,
+                [],
+                ConvergenceDetector(),
+            )
+        ]
+
+        text = "".join(
+            json.loads(event[2:])["text"] for event in events if event.startswith("0:")
+        )
+        assert text == "".join(tokens)
+        assert list(dependencies.budget_tracker.recent_responses) == [
+            "| a | b |",
+            "|---|---|---|",
+        ]
+
     @pytest.mark.asyncio
     async def test_streaming_conversation_context_update(self, factory, mock_agent):
         """Test that conversation context is properly updated during streaming."""
@@ -395,9 +486,7 @@ class TestEnhancedStreaming:
         with patch.object(
             factory, "create_agent_with_context", return_value=mock_agent
         ):
-            with patch.object(
-                factory, "_ensure_mcp_connection_tested", new_callable=AsyncMock
-            ):
+            with patch.object(factory, "_test_mcp_connection", new_callable=AsyncMock):
 
                 # Mock stream result with messages
                 mock_messages = [MagicMock(), MagicMock()]
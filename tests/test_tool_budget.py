@@ -9,7 +9,7 @@ Tests all stopping criteria and budget tracking functionality.
 
 import pytest
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from api.agents.universal import ToolBudget, BudgetTracker
 
 
@@ -167,7 +167,7 @@ class TestBudgetTracker:
 
         # Reset and test time budget
         tracker.current_depth = 0
-        tracker.start_time = datetime.now() - timedelta(seconds=3)  # 3 seconds ago
+        tracker._start_monotonic = time.monotonic() - 3  # 3 seconds ago
         should_stop, reason = tracker.should_stop(budget)
         assert should_stop
         assert "time budget" in reason
@@ -236,6 +236,25 @@ class TestBudgetTracker:
         should_stop, reason = tracker.should_stop(budget)
         assert not should_stop
 
+    def test_confidence_window_slides(self):
+        """Test that only the last three confidence scores drive stopping"""
+        budget = ToolBudget(min_confidence=0.5)
+        tracker = BudgetTracker()
+
+        # Low early scores drop out of the window as better ones arrive
+        topics = ["auth", "database", "frontend", "caching", "logging", "routing"]
+        for topic, confidence in zip(topics, [0.1, 0.1, 0.1, 0.9, 0.9, 0.9]):
+            tracker.add_response(f"Notes about {topic}", confidence)
+
+        should_stop, reason = tracker.should_stop(budget)
+        assert not should_stop
+
+        tracker.add_response("Unclear answer one", 0.0)
+        tracker.add_response("Another vague reply", 0.0)
+        should_stop, reason = tracker.should_stop(budget)
+        assert should_stop
+        assert "Confidence below threshold" in reason
+
     def test_calculate_similarity(self):
         """Test text similarity calculation"""
         tracker = BudgetTracker()